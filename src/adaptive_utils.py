@@ -0,0 +1,374 @@
+'''
+Adaptive (FGK) Huffman coding, which needs no training corpus: the encoder
+and decoder both start from an empty trie and update it identically after
+every char, so the code always reflects the message so far.
+'''
+
+from typing import *
+from compression_utils import *
+
+class AdaptiveNode(HuffmanNode):
+    '''
+    HuffmanNode of an AdaptiveTrie, which also knows its parent and its rank
+    in the trie's sibling ordering.
+    '''
+    
+    __slots__ = ("parent", "order")
+
+    def __init__(self, char: str, parent: Optional["AdaptiveNode"], order: int):
+        '''
+        Creates a node of frequency 0 with no children.
+
+        Parameters:
+            char (str):
+                The char of a leaf, or "" for an internal node or the NYT node
+            parent (Optional[AdaptiveNode]):
+                The parent of the node, or None for the root
+            order (int):
+                The node's index in AdaptiveTrie.nodes, in which nodes appear
+                by nonincreasing frequency (the root first)
+        '''
+        super().__init__(char, 0)
+        self.parent = parent
+        self.order = order
+
+class AdaptiveTrie:
+    '''
+    The Huffman Trie of the FGK algorithm, which keeps the sibling property
+    (nodes can be listed by nonincreasing frequency with siblings adjacent)
+    as char frequencies are incremented one at a time. Chars not yet seen
+    share a single "not yet transmitted" (NYT) leaf.
+    '''
+
+    def __init__(self) -> None:
+        '''
+        Creates a trie consisting of just the NYT leaf.
+        '''
+        self.nyt = AdaptiveNode("", None, 0)
+        self.root = self.nyt
+        self.nodes: list[AdaptiveNode] = [self.nyt]
+        self.leaves: dict[str, AdaptiveNode] = {}
+        # The rank of the first (highest-ranked) node of each frequency, whose
+        # nodes are adjacent in self.nodes
+        self.leaders: dict[int, int] = {0: 0}
+
+    def code(self, node: AdaptiveNode) -> tuple[int, int]:
+        '''
+        Parameters:
+            node (AdaptiveNode):
+                A node of the trie
+
+        Returns:
+            tuple[int, int]:
+                The node's current code as an (int value, bit length) pair
+        '''
+        value, length = 0, 0
+        while node.parent is not None:
+            if node is node.parent.one_child:
+                value |= 1 << length
+            length += 1
+            node = node.parent
+        return value, length
+
+    def increment(self, char: str) -> None:
+        '''
+        Counts one more occurrence of the given char, first splitting the NYT
+        leaf to add it if it is new, and then walking up to the root, swapping
+        each node with the highest-ranked node of equal frequency (other than
+        its parent, and found through self.leaders) before incrementing it, so
+        as to keep the sibling property.
+
+        Parameters:
+            char (str):
+                The char just encoded or decoded
+        '''
+        node = self.leaves.get(char)
+        if node is None:
+            # The NYT leaf becomes the parent of the new leaf and a new NYT
+            parent = self.nyt
+            node = AdaptiveNode(char, parent, len(self.nodes))
+            self.nyt = AdaptiveNode("", parent, len(self.nodes) + 1)
+            parent.one_child, parent.zero_child = node, self.nyt
+            self.nodes += [node, self.nyt]
+            self.leaves[char] = node
+
+        nodes, leaders = self.nodes, self.leaders
+        current: Optional[AdaptiveNode] = node
+        while current is not None:
+            freq = current.freq
+            current.freq = freq + 1
+            leader = leaders[freq]
+            if leader != current.order:
+                if nodes[leader] is current.parent:
+                    # The node stays right behind its parent, which joins the
+                    # next frequency just in front of it
+                    current = current.parent
+                    continue
+                self._swap(current, nodes[leader])
+            # The node leaves the front of its frequency's nodes for the back
+            # of the next frequency's (the NYT leaf, always last, is never
+            # incremented, so a next node exists)
+            if nodes[leader + 1].freq == freq:
+                leaders[freq] = leader + 1
+            else:
+                del leaders[freq]
+            if freq + 1 not in leaders:
+                leaders[freq + 1] = leader
+            current = current.parent
+        # Once the whole path is counted, only the NYT leaf is left at 0
+        leaders[0] = self.nyt.order
+
+    def _swap(self, first: AdaptiveNode, second: AdaptiveNode) -> None:
+        '''
+        Exchanges the positions (and ranks) of two nodes, neither of which is
+        an ancestor of the other, along with their subtries.
+
+        Parameters:
+            first, second (AdaptiveNode):
+                The nodes to exchange
+        '''
+        first_parent, second_parent = first.parent, second.parent
+        assert first_parent is not None and second_parent is not None
+        if first_parent is second_parent:
+            first_parent.zero_child, first_parent.one_child = first_parent.one_child, first_parent.zero_child
+        else:
+            if first_parent.zero_child is first:
+                first_parent.zero_child = second
+            else:
+                first_parent.one_child = second
+            if second_parent.zero_child is second:
+                second_parent.zero_child = first
+            else:
+                second_parent.one_child = first
+            first.parent, second.parent = second_parent, first_parent
+        self.nodes[first.order], self.nodes[second.order] = second, first
+        first.order, second.order = second.order, first.order
+
+def raw_length(lead_byte: int) -> int:
+    '''
+    Parameters:
+        lead_byte (int):
+            The first byte of a char's UTF-8 encoding
+
+    Returns:
+        int:
+            The number of bytes in that char's UTF-8 encoding
+    '''
+    return 1 if lead_byte < 0xC0 else 2 if lead_byte < 0xE0 else 3 if lead_byte < 0xF0 else 4
+
+class AdaptiveEncoder:
+    '''
+    Incremental adaptive Huffman encoder (see: AdaptiveHuffman).
+    '''
+
+    def __init__(self) -> None:
+        '''
+        Creates an encoder positioned at the start of a message.
+        '''
+        self._reset()
+
+    def _reset(self) -> None:
+        '''
+        Empties the trie and bit accumulator, to start a new message.
+        '''
+        self._trie = AdaptiveTrie()
+        self._acc = 0
+        self._acc_bits = 0
+
+    def feed(self, text: str) -> bytes:
+        '''
+        Encodes the next piece of the message.
+
+        Parameters:
+            text (str):
+                The chars following those given to previous calls
+
+        Returns:
+            bytes:
+                The bytes completed by this piece; bits of a partial byte are
+                held back until the next call
+        '''
+        out = bytearray()
+        trie, acc, acc_bits = self._trie, self._acc, self._acc_bits
+        for char in text:
+            leaf = trie.leaves.get(char)
+            if leaf is not None:
+                value, length = trie.code(leaf)
+            else:
+                # New chars are sent as the NYT code followed by their UTF-8
+                raw = char.encode("utf-8", "surrogatepass")
+                value, length = trie.code(trie.nyt)
+                value = value << (len(raw) << 3) | int.from_bytes(raw, "big")
+                length += len(raw) << 3
+            trie.increment(char)
+            acc = acc << length | value
+            acc_bits += length
+            if acc_bits >= 64:
+                leftover = acc_bits & 7
+                out += (acc >> leftover).to_bytes(acc_bits >> 3, "big")
+                acc &= (1 << leftover) - 1
+                acc_bits = leftover
+        self._acc, self._acc_bits = acc, acc_bits
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        '''
+        Ends the message, and resets the encoder for another one.
+
+        Returns:
+            bytes:
+                The remaining bytes of the message, terminated by the ETB_CHAR
+                and padding
+        '''
+        out = bytearray(self.feed(ETB_CHAR))
+        pad_bits(out, self._acc, self._acc_bits)
+        self._reset()
+        return bytes(out)
+
+class AdaptiveDecoder:
+    '''
+    Incremental adaptive Huffman decoder (see: AdaptiveHuffman).
+    '''
+
+    def __init__(self) -> None:
+        '''
+        Creates a decoder positioned at the start of a message.
+        '''
+        self._reset()
+
+    def _reset(self) -> None:
+        '''
+        Empties the trie and any partial code, to start a new message.
+        '''
+        self._trie = AdaptiveTrie()
+        self._node = self._trie.root
+        # Bits of a new char's UTF-8 encoding read so far, and how many there
+        # will be (0 while not reading one); the first char of a message is
+        # always new, and its NYT code is empty
+        self._raw = 0
+        self._raw_bits = 0
+        self._raw_needed = 8
+        self.done = False
+
+    def feed(self, data: bytes) -> str:
+        '''
+        Decodes the next piece of the compressed message, walking the trie one
+        bit at a time.
+
+        Parameters:
+            data (bytes):
+                The bytes following those given to previous calls; ignored once
+                the message is done
+
+        Returns:
+            str:
+                The chars completed by this piece, stopping before the ETB_CHAR
+                if it is reached (after which done is True)
+        '''
+        decoded: list[str] = []
+        trie = self._trie
+        for byte in data:
+            for shift in range(7, -1, -1):
+                if self.done:
+                    return "".join(decoded)
+                bit = byte >> shift & 1
+                char = ""
+                if self._raw_needed:
+                    self._raw = self._raw << 1 | bit
+                    self._raw_bits += 1
+                    if self._raw_bits == 8:
+                        self._raw_needed = raw_length(self._raw) << 3
+                    if self._raw_bits == self._raw_needed:
+                        char = self._raw.to_bytes(self._raw_bits >> 3, "big").decode("utf-8", "surrogatepass")
+                        self._raw, self._raw_bits, self._raw_needed = 0, 0, 0
+                else:
+                    child = self._node.one_child if bit else self._node.zero_child
+                    assert isinstance(child, AdaptiveNode)
+                    self._node = child
+                    if child is trie.nyt:
+                        self._raw_needed = 8
+                    elif child.is_leaf():
+                        char = child.char
+                if char:
+                    trie.increment(char)
+                    self._node = trie.root
+                    if char == ETB_CHAR:
+                        self.done = True
+                    else:
+                        decoded.append(char)
+        return "".join(decoded)
+
+    def flush(self) -> str:
+        '''
+        Signals the end of the input, discarding any incomplete code, and
+        resets the decoder so it can decode another message.
+
+        Returns:
+            str:
+                Always "", since feed decodes eagerly
+        '''
+        self._reset()
+        return ""
+
+class AdaptiveHuffman:
+    '''
+    Adaptive Huffman encoder / decoder, which unlike ReusableHuffman needs no
+    training corpus: each message is coded with a trie that starts out empty
+    and adapts to the message's own chars as it goes. Chars are sent as their
+    UTF-8 bytes the first time they appear, and messages use the same
+    ETB_CHAR termination and 0-bit padding as ReusableHuffman.
+    '''
+
+    def compress_message(self, message: str) -> bytes:
+        '''
+        Parameters:
+            message (str):
+                The message to compress
+
+        Returns:
+            bytes:
+                The compressed message, terminated by the ETB_CHAR and padding
+        '''
+        encoder = AdaptiveEncoder()
+        return encoder.feed(message) + encoder.flush()
+
+    def compress_stream(self, chunks: Iterable[str]) -> Iterator[bytes]:
+        '''
+        Compresses a message that arrives in pieces, yielding its compressed
+        bytes incrementally.
+
+        Parameters:
+            chunks (Iterable[str]):
+                The consecutive pieces of the message
+
+        Returns:
+            Iterator[bytes]:
+                The compressed message in consecutive pieces, whose
+                concatenation equals compress_message of the whole message
+        '''
+        encoder = AdaptiveEncoder()
+        for chunk in chunks:
+            compressed_chunk = encoder.feed(chunk)
+            if compressed_chunk:
+                yield compressed_chunk
+        yield encoder.flush()
+
+    def decompress(self, compressed_msg: bytes) -> str:
+        '''
+        Parameters:
+            compressed_msg (bytes):
+                A message compressed by compress_message
+
+        Returns:
+            str:
+                The decompressed message
+        '''
+        return AdaptiveDecoder().feed(compressed_msg)
+
+    def decoder(self) -> AdaptiveDecoder:
+        '''
+        Returns:
+            AdaptiveDecoder:
+                A new incremental decoder, positioned at the start of a message
+        '''
+        return AdaptiveDecoder()
@@ -2,7 +2,10 @@
 Several useful helper methods for converting between strings and bytes.
 '''
 
-from bitstring import Bits
+from typing import *
+
+# Precomputed 8-bit bitstring of every byte value, indexed by that value
+BYTE_BITSTRINGS: tuple[str, ...] = tuple(format(b, "08b") for b in range(256))
 
 def bitstrings_to_bytes(bitstrings: list[str]) -> bytes:
     '''
@@ -44,5 +47,108 @@ def byte_to_bitstring(b: int) -> str:
         #    10100010
         #    00000011
     '''
-    result: str = Bits(uint=str(b), length=8).bin
-    return result
\ No newline at end of file
+    return BYTE_BITSTRINGS[b]
+
+def bytes_to_bitstring(data: bytes) -> str:
+    '''
+    Converts a whole sequence of bytes into one bitstring, 8 bits per byte,
+    using a single pass over the precomputed BYTE_BITSTRINGS table.
+    
+    Parameters:
+        data (bytes):
+            The byte sequence to convert
+    
+    Returns:
+        str:
+            The concatenated bitstrings of every byte in data
+    
+    Example:
+        bytes_to_bitstring(b'\xa2\x03')
+        => '1010001000000011'
+    '''
+    return "".join(map(BYTE_BITSTRINGS.__getitem__, data))
+
+def bitstring_to_bytes(bitstring: str) -> bytes:
+    '''
+    Converts a bitstring of any length into its bytes equivalent in a single
+    conversion, padding the final byte with 0 bits as needed.
+    
+    Parameters:
+        bitstring (str):
+            The bitstring to convert, most significant bit first
+    
+    Returns:
+        bytes:
+            The byte sequence of the padded bitstring
+    
+    Example:
+        bitstring_to_bytes('1010001111100')
+        => b'\xa3\xe0'
+    '''
+    if not bitstring:
+        return b""
+    padding = -len(bitstring) % 8
+    return (int(bitstring, 2) << padding).to_bytes((len(bitstring) + padding) >> 3, "big")
+
+def pack_codes(code_table: Mapping[str, tuple[int, int]], symbols: Iterable[str],
+               out: bytearray, acc: int = 0, acc_bits: int = 0) -> tuple[int, int]:
+    '''
+    Appends the codes of the given symbols to a bit accumulator, flushing it
+    into out in whole bytes whenever it holds at least 64 bits. Bits that do
+    not yet fill a byte stay in the accumulator, which is returned so that
+    packing can be resumed with more symbols (see also: pad_bits). This is
+    the plain one-symbol-at-a-time packer; ReusableHuffman does not use it,
+    packing with str.translate instead, but produces the same bytes.
+    
+    Parameters:
+        code_table (Mapping[str, tuple[int, int]]):
+            Maps each symbol to its code as an (int value, bit length) pair;
+            symbols missing from it are skipped
+        symbols (Iterable[str]):
+            The symbols whose codes are packed, in order
+        out (bytearray):
+            The buffer that completed bytes are appended to
+        acc, acc_bits (int):
+            The pending bits (most significant first) and their count
+    
+    Returns:
+        tuple[int, int]:
+            The new (acc, acc_bits) after packing all of the symbols
+    
+    Example:
+        out = bytearray()
+        pack_codes({"A": (0b101, 3), "B": (0b0, 1)}, "ABB", out)
+        => (0b10100, 5), with out still empty
+    '''
+    for symbol in symbols:
+        code = code_table.get(symbol)
+        if code is None:
+            continue
+        value, length = code
+        acc = acc << length | value
+        acc_bits += length
+        if acc_bits >= 64:
+            leftover = acc_bits & 7
+            out += (acc >> leftover).to_bytes(acc_bits >> 3, "big")
+            acc &= (1 << leftover) - 1
+            acc_bits = leftover
+    return acc, acc_bits
+
+def pad_bits(out: bytearray, acc: int, acc_bits: int) -> None:
+    '''
+    Flushes all pending bits of an accumulator (see: pack_codes) into out,
+    padding the final byte with 0 bits as needed.
+    
+    Parameters:
+        out (bytearray):
+            The buffer that the remaining bytes are appended to
+        acc, acc_bits (int):
+            The pending bits (most significant first) and their count
+    
+    Example:
+        out = bytearray()
+        pad_bits(out, 0b10100, 5)
+        => out == bytearray(b'\xa0')
+    '''
+    padding = -acc_bits % 8
+    out += (acc << padding).to_bytes((acc_bits + padding) >> 3, "big")
@@ -0,0 +1,624 @@
+'''
+Timing harness for the ReusableHuffman encoder / decoder. Each benchmark
+prints a small table of its measurements; run all of them with
+`python compression_benchmarks.py`, or only some by name, e.g.
+`python compression_benchmarks.py training`.
+'''
+
+import copy
+import os
+import pickle
+import random
+import sys
+import tempfile
+import tracemalloc
+import time
+from typing import *
+from compression_utils import *
+from training_utils import *
+from adaptive_utils import *
+from vectorized_utils import *
+
+def best_time(fn: Callable[[], Any], repeat: int = 3) -> float:
+    '''
+    Runs the given function several times and reports its fastest run,
+    which is the measurement least disturbed by other system activity.
+
+    Parameters:
+        fn (Callable[[], Any]):
+            The zero-argument function to time
+        repeat (int):
+            How many times to run it
+
+    Returns:
+        float:
+            The fastest of the measured runs, in seconds
+    '''
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def random_corpus(size: int, alphabet_size: int, seed: int = 2130) -> str:
+    '''
+    Generates a reproducible corpus of the given length whose characters are
+    drawn from a skewed (Zipf-like) distribution over alphabet_size distinct
+    code points, starting at "!" to avoid the ETB_CHAR.
+
+    Parameters:
+        size (int):
+            Number of characters in the generated corpus
+        alphabet_size (int):
+            Number of distinct characters available to draw from
+        seed (int):
+            Seed for the random number generator
+
+    Returns:
+        str:
+            The generated corpus
+    '''
+    rng = random.Random(seed)
+    # Skip the surrogate range, which cannot be encoded by most codecs
+    alphabet = [chr(cp) for cp in range(0x21, 0x21 + alphabet_size + 0x800)
+                if not 0xD800 <= cp <= 0xDFFF][:alphabet_size]
+    weights = [1 / (rank + 1) for rank in range(alphabet_size)]
+    return "".join(rng.choices(alphabet, weights, k=size))
+
+def legacy_compress(huff_coder: ReusableHuffman, message: str) -> bytes:
+    '''
+    The original compress_message, which builds the output as a '0'/'1' str
+    that is cut into 8-bit chunks; kept here as a baseline for comparison.
+    
+    Parameters:
+        huff_coder (ReusableHuffman):
+            The trained encoder whose encoding map is used
+        message (str):
+            The message to compress
+    
+    Returns:
+        bytes:
+            The compressed message
+    '''
+    encode_map = huff_coder.get_encoding_map()
+    message += ETB_CHAR
+    bitstr = ''
+    final_bitstr: list[str] = []
+    for char in message:
+        if char in encode_map:
+            for num in encode_map[char]:
+                if len(bitstr) == 8:
+                    final_bitstr.append(bitstr)
+                    bitstr = ''
+                bitstr += num
+    while len(bitstr) != 8:
+        bitstr += '0'
+    final_bitstr.append(bitstr)
+    return bitstrings_to_bytes(final_bitstr)
+
+def legacy_decompress(huff_coder: ReusableHuffman, compressed_msg: bytes) -> str:
+    '''
+    The original decompress, which expands the input into a '0'/'1' str and
+    walks the trie one bit at a time; kept here as a baseline for comparison.
+    
+    Parameters:
+        huff_coder (ReusableHuffman):
+            The trained decoder whose trie is used
+        compressed_msg (bytes):
+            The message to decompress
+    
+    Returns:
+        str:
+            The decompressed message
+    '''
+    encoded_msg = "".join(byte_to_bitstring(byte) for byte in compressed_msg)
+    decoded_msg: list[str] = []
+    trie_root = trie_from_codes(huff_coder.get_encoding_map())
+    node = trie_root
+    for bit in encoded_msg:
+        if bit == '0' and node.zero_child is not None:
+            node = node.zero_child
+        elif bit == '1' and node.one_child is not None:
+            node = node.one_child
+        if node.is_leaf():
+            if node.char == ETB_CHAR:
+                break
+            decoded_msg.append(node.char)
+            node = trie_root
+    return "".join(decoded_msg)
+
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def benchmark_training() -> None:
+    '''
+    Shows that training time grows linearly with the size of the corpus,
+    regardless of how many distinct characters that corpus contains.
+    '''
+    print("training: corpus size vs. alphabet size (seconds)")
+    sizes = [250_000, 500_000, 1_000_000, 2_000_000]
+    print("%10s" % "alphabet" + "".join("%12d" % size for size in sizes))
+    for alphabet_size in [16, 256, 4096]:
+        row = "%10d" % alphabet_size
+        for size in sizes:
+            corpus = random_corpus(size, alphabet_size)
+            row += "%12.4f" % best_time(lambda: ReusableHuffman(corpus))
+        print(row)
+
+def benchmark_trie_builders() -> None:
+    '''
+    Compares growing the trie through a locking queue.PriorityQueue against
+    the lock-free heapq engine and the two-queue engine (including the sort
+    of its leaves) for several alphabet sizes.
+    '''
+    print("trie construction (seconds)")
+    print("%10s%14s%14s%14s" % ("alphabet", "PriorityQueue", "heapq", "two_queue"))
+    huff_coder = ReusableHuffman("")
+    for alphabet_size in [256, 4096, 65536]:
+        frequencies = count_frequencies(random_corpus(4 * alphabet_size, alphabet_size))
+        def with_queue() -> None:
+            queue: PriorityQueue[HuffmanNode] = PriorityQueue()
+            for char, freq in frequencies.items():
+                queue.put(HuffmanNode(char, freq))
+            huff_coder.grow_trie(queue)
+        def with_heap() -> None:
+            build_trie_heap([HuffmanNode(char, freq) for char, freq in frequencies.items()])
+        def with_two_queue() -> None:
+            build_trie_two_queue(sorted(HuffmanNode(char, freq) for char, freq in frequencies.items()))
+        print("%10d%14.4f%14.4f%14.4f" % (alphabet_size, best_time(with_queue),
+                                          best_time(with_heap), best_time(with_two_queue)))
+
+def benchmark_tiny_messages(count: int = 1_000_000) -> None:
+    '''
+    Measures compressing many tiny messages, comparing against a baseline that
+    also deep-copies the encoding map on every call (as compress_message used
+    to do through get_encoding_map).
+    '''
+    print("%d tiny messages (seconds)" % count)
+    huff_coder = ReusableHuffman(random_corpus(100_000, 64))
+    messages = [random_corpus(8, 64, seed) for seed in range(1000)] * (count // 1000)
+    encoding_map = huff_coder.get_encoding_map()
+    def with_deepcopy() -> None:
+        for message in messages:
+            copy.deepcopy(encoding_map)
+            huff_coder.compress_message(message)
+    def without_copy() -> None:
+        for message in messages:
+            huff_coder.compress_message(message)
+    copy_time, direct_time = best_time(with_deepcopy, 1), best_time(without_copy, 1)
+    print("%14s%14s%10s" % ("deepcopy", "direct", "speedup"))
+    print("%14.4f%14.4f%9.1fx" % (copy_time, direct_time, copy_time / direct_time))
+
+def benchmark_compression(size: int = 4_000_000) -> None:
+    '''
+    Compares the original bitstring-based compressor with compress_message
+    on a multi-megabyte message.
+    '''
+    print("compressing a %d character message (seconds)" % size)
+    message = random_corpus(size, 256)
+    huff_coder = ReusableHuffman(message)
+    legacy_time = best_time(lambda: legacy_compress(huff_coder, message), 1)
+    packed_time = best_time(lambda: huff_coder.compress_message(message), 1)
+    print("%14s%14s%10s" % ("bitstring", "current", "speedup"))
+    print("%14.4f%14.4f%9.1fx" % (legacy_time, packed_time, legacy_time / packed_time))
+
+def ascii_logs(size: int, seed: int = 2130) -> str:
+    '''
+    Parameters:
+        size (int):
+            Approximate number of characters to generate
+        seed (int):
+            Seed for the random number generator
+    
+    Returns:
+        str:
+            Reproducible lines of a web server's access log
+    '''
+    rng = random.Random(seed)
+    paths = ["/", "/index.html", "/api/v1/users", "/api/v1/orders", "/static/app.js", "/login"]
+    lines: list[str] = []
+    length = 0
+    while length < size:
+        line = '10.0.%d.%d - - [15/Oct/2026:%02d:%02d:%02d +0000] "GET %s HTTP/1.1" %d %d\n' % (
+            rng.randrange(256), rng.randrange(256), rng.randrange(24), rng.randrange(60),
+            rng.randrange(60), rng.choice(paths), rng.choice([200, 200, 200, 304, 404]),
+            rng.randrange(100_000))
+        lines.append(line)
+        length += len(line)
+    return "".join(lines)
+
+def benchmark_translate(sizes: Sequence[int] = (1_000, 100_000, 10_000_000, 100_000_000)) -> None:
+    '''
+    Compares packing each char's code in a Python loop with the str.translate
+    expansion that compress_message uses, on ASCII logs at every size and on
+    Unicode text (whose strs take up to 4 times the memory) up to 10M chars.
+    '''
+    print("compressing with str.translate (MB/s)")
+    print("%16s%12s%10s%12s%10s" % ("text", "characters", "loop", "translate", "speedup"))
+    texts: list[tuple[str, Callable[[int], str], int]] = [
+        ("ascii logs", ascii_logs, max(sizes)),
+        ("unicode 4096", lambda size: random_corpus(size, 4096), 10_000_000)]
+    for name, generate, max_size in texts:
+        huff_coder = ReusableHuffman(generate(100_000))
+        code_table = {char: (int(code, 2), len(code)) for char, code in huff_coder.get_encoding_map().items()}
+        for size in sizes:
+            if size > max_size:
+                continue
+            message = generate(size)[:size]
+            
+            def loop_compress() -> bytes:
+                compressed_msg = bytearray()
+                acc, acc_bits = pack_codes(code_table, message + ETB_CHAR, compressed_msg)
+                pad_bits(compressed_msg, acc, acc_bits)
+                return bytes(compressed_msg)
+            
+            assert loop_compress() == huff_coder.compress_message(message)
+            repeat = max(1, 100_000 // size) if size < 1_000_000 else 1
+            loop_time = best_time(lambda: [loop_compress() for _ in range(repeat)]) / repeat
+            translate_time = best_time(lambda: [huff_coder.compress_message(message) for _ in range(repeat)]) / repeat
+            print("%16s%12d%10.2f%12.2f%9.2fx" % (name, size, size / loop_time / 1e6,
+                                                  size / translate_time / 1e6, loop_time / translate_time))
+            del message
+
+def benchmark_vector_encoder() -> None:
+    '''
+    Compares compress_message with the NumPy VectorEncoder on messages of
+    increasing size.
+    '''
+    if np is None:
+        print("vector encoder: NumPy is not installed")
+        return
+    print("compressing with the vector encoder (MB/s)")
+    print("%12s%16s%10s%10s" % ("characters", "compress_message", "vector", "speedup"))
+    for size in [1_000, 100_000, 10_000_000]:
+        message = random_corpus(size, 256)
+        huff_coder = ReusableHuffman(message)
+        encoder = VectorEncoder(huff_coder)
+        assert encoder.compress_message(message) == huff_coder.compress_message(message)
+        repeat = 3 if size < 1_000_000 else 1
+        scalar_time = best_time(lambda: huff_coder.compress_message(message), repeat)
+        vector_time = best_time(lambda: encoder.compress_message(message), repeat)
+        print("%12d%16.2f%10.2f%9.1fx" % (size, size / scalar_time / 1e6, size / vector_time / 1e6,
+                                          scalar_time / vector_time))
+
+def benchmark_decompression(size: int = 1_000_000) -> None:
+    '''
+    Reports the decompression throughput (in MB of compressed input per
+    second) of the original bit-by-bit trie walk and of the table-driven
+    decoder for several table sizes.
+    '''
+    print("decompressing a %d character message (MB/s)" % size)
+    message = random_corpus(size, 256)
+    compressed_msg = ReusableHuffman(message).compress_message(message)
+    megabytes = len(compressed_msg) / 1e6
+    huff_coder = ReusableHuffman(message)
+    print("%14s%10.2f" % ("bit walk", megabytes / best_time(lambda: legacy_decompress(huff_coder, compressed_msg), 1)))
+    for bits in [8, 10, 12]:
+        huff_coder = ReusableHuffman(message, decode_table_bits=bits)
+        huff_coder.get_decode_table()
+        rate = megabytes / best_time(lambda: huff_coder.decompress(compressed_msg))
+        print("%14s%10.2f" % ("table k=%d" % bits, rate))
+
+def benchmark_vector_decoder(sizes: Sequence[int] = (100_000, 1_000_000, 10_000_000)) -> None:
+    '''
+    Compares decompress with the NumPy VectorDecoder on messages of
+    increasing size and alphabets of increasing size. The time to set up the
+    vector decoder's tables is reported next to that of the model's own
+    decode table, and left out of the throughputs.
+    '''
+    if np is None:
+        print("vector decoder: NumPy is not installed")
+        return
+    print("decompressing with the vector decoder (MB/s; setup in seconds)")
+    print("%12s%10s%12s%10s%10s%13s%14s" % (
+        "characters", "alphabet", "decompress", "vector", "speedup", "table setup", "vector setup"))
+    for size in sizes:
+        for alphabet_size in [64, 256, 4000]:
+            message = random_corpus(size, alphabet_size)
+            huff_coder = ReusableHuffman(message)
+            table_setup = best_time(lambda: build_decode_table(trie_from_codes(huff_coder.get_encoding_map()), 10), 1)
+            vector_setup = best_time(lambda: VectorDecoder(huff_coder), 1)
+            decoder = VectorDecoder(huff_coder)
+            compressed_msg = huff_coder.compress_message(message)
+            assert decoder.decompress(compressed_msg) == message
+            repeat = 3 if size < 1_000_000 else 1
+            scalar_time = best_time(lambda: huff_coder.decompress(compressed_msg), repeat)
+            vector_time = best_time(lambda: decoder.decompress(compressed_msg), repeat)
+            print("%12d%10d%12.2f%10.2f%9.1fx%13.4f%14.4f" % (
+                size, alphabet_size, size / scalar_time / 1e6, size / vector_time / 1e6,
+                scalar_time / vector_time, table_setup, vector_setup))
+
+def benchmark_length_limits() -> None:
+    '''
+    Reports the compression ratio lost by capping code lengths, for a skewed
+    corpus and for frequencies that make the unconstrained trie very deep.
+    '''
+    fibonacci = [1, 1]
+    while len(fibonacci) < 40:
+        fibonacci.append(fibonacci[-1] + fibonacci[-2])
+    tables = {
+        "zipf, 4K symbols": count_frequencies(random_corpus(1_000_000, 4096)),
+        "fibonacci, 40 symbols": {chr(0x41 + i): freq for i, freq in enumerate(fibonacci)},
+    }
+    print("compression ratio lost to a maximum code length (%)")
+    print("%22s%10s%10s%10s%10s" % ("frequencies", "longest", "12 bits", "15 bits", "24 bits"))
+    for name, frequencies in tables.items():
+        frequencies[ETB_CHAR] = 1
+        longest = max(trie_code_lengths(build_trie(frequencies)).values())
+        costs = ["%10s" % "-" if 1 << cap < len(frequencies)
+                 else "%10.3f" % (100 * length_limit_cost(frequencies, cap)) for cap in [12, 15, 24]]
+        print("%22s%10d" % (name, longest) + "".join(costs))
+
+def benchmark_model_loading(size: int = 2_000_000) -> None:
+    '''
+    Compares cold-starting a ReusableHuffman by retraining, by unpickling and
+    by loading its binary model file, along with the sizes of those files.
+    '''
+    corpus = random_corpus(size, 16384)
+    print("cold start of a %d symbol model" % len(set(corpus)))
+    print("%14s%12s%12s" % ("", "seconds", "bytes"))
+    print("%14s%12.4f%12s" % ("retraining", best_time(lambda: ReusableHuffman(corpus), 1), "-"))
+    with tempfile.TemporaryDirectory() as directory:
+        for canonical in [False, True]:
+            huff_coder = ReusableHuffman(corpus, canonical=canonical)
+            huff_coder.get_decode_table()
+            pickled = pickle.dumps(huff_coder)
+            print("%14s%12.4f%12d" % ("unpickling", best_time(lambda: pickle.loads(pickled)), len(pickled)))
+            path = os.path.join(directory, "model.huf")
+            huff_coder.save_model(path)
+            name = "canonical" if canonical else "binary"
+            print("%14s%12.4f%12d" % (name, best_time(lambda: ReusableHuffman.load_model(path)),
+                                      os.path.getsize(path)))
+
+def benchmark_parallel_training(size: int = 20_000_000) -> None:
+    '''
+    Measures how training from a corpus file scales with the number of
+    worker processes counting it.
+    '''
+    print("training on a %d character file (seconds)" % size)
+    print("%10s%12s%10s" % ("workers", "seconds", "speedup"))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.txt")
+        with open(path, "w", encoding="utf-8") as corpus_file:
+            corpus_file.write(random_corpus(size, 4096))
+        serial_time = 0.0
+        for workers in [1, 2, 4, 8, 16, 32]:
+            if workers > (os.cpu_count() or 1):
+                break
+            elapsed = best_time(lambda: train_parallel(path, workers), 1)
+            serial_time = serial_time or elapsed
+            print("%10d%12.4f%9.1fx" % (workers, elapsed, serial_time / elapsed))
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    '''
+    Parameters:
+        fn (Callable[[], Any]):
+            The zero-argument function to measure
+    
+    Returns:
+        int:
+            The peak number of bytes allocated by Python while running fn
+    '''
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def retained_memory(fn: Callable[[], Any]) -> int:
+    '''
+    Parameters:
+        fn (Callable[[], Any]):
+            The zero-argument function to measure
+    
+    Returns:
+        int:
+            The number of bytes allocated by Python while running fn that are
+            still held by its result
+    '''
+    tracemalloc.start()
+    try:
+        result = fn()
+        retained = tracemalloc.get_traced_memory()[0]
+        del result
+        return retained
+    finally:
+        tracemalloc.stop()
+
+def benchmark_file_training() -> None:
+    '''
+    Compares the peak memory of training on a file's contents read into a
+    str with that of training from the memory-mapped file.
+    '''
+    print("peak memory of training on a file (MB)")
+    print("%12s%12s%12s" % ("characters", "in memory", "from file"))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.txt")
+        for size in [1_000_000, 4_000_000, 16_000_000]:
+            with open(path, "w", encoding="utf-8") as corpus_file:
+                corpus_file.write(random_corpus(size, 4096))
+            def in_memory() -> None:
+                with open(path, encoding="utf-8", newline="") as corpus_file:
+                    ReusableHuffman(corpus_file.read())
+            print("%12d%12.1f%12.1f" % (size, peak_memory(in_memory) / 1e6,
+                                        peak_memory(lambda: train_from_file(path)) / 1e6))
+
+def benchmark_sampled_training(size: int = 10_000_000) -> None:
+    '''
+    Compares training on samples of a corpus with training on all of it: the
+    time taken, the estimated and actual loss of compression ratio, and the
+    estimated and actual share of the corpus made up of unsampled chars.
+    '''
+    corpus = random_corpus(size, 4096)
+    full_model = ReusableHuffman(corpus)
+    frequencies = count_frequencies(corpus)
+    full_bits = average_code_length(frequencies, dict(full_model.get_code_lengths()))
+    print("training on samples of a %d character corpus" % size)
+    print("%10s%10s%12s%12s%12s%12s" % ("sample", "seconds", "est. loss", "loss", "est. unseen", "unseen"))
+    print("%10s%10.4f%11.3f%%%11.3f%%%11.3f%%%11.3f%%" % (
+        "all", best_time(lambda: ReusableHuffman(corpus), 1), 0, 0, 0, 0))
+    for sample_size in [10_000, 100_000, 1_000_000]:
+        result = train_sampled(corpus, sample_size, seed=2130)
+        elapsed = best_time(lambda: train_sampled(corpus, sample_size, seed=2130), 1)
+        sampled_bits = average_code_length(frequencies, dict(result.model.get_code_lengths()))
+        sampled = set(sample_chars(corpus, sample_size, seed=2130)[0])
+        unseen = sum(count for char, count in frequencies.items() if char not in sampled) / size
+        print("%10d%10.4f%11.3f%%%11.3f%%%11.3f%%%11.3f%%" % (
+            sample_size, elapsed, 100 * result.estimated_ratio_loss, 100 * (sampled_bits / full_bits - 1),
+            100 * result.unseen_mass, 100 * unseen))
+
+def benchmark_updates(batch_size: int = 200_000) -> None:
+    '''
+    Compares folding a new batch of text into a model with update against
+    retraining on the whole, ever-growing corpus.
+    '''
+    print("adding %d character batches (seconds)" % batch_size)
+    print("%12s%12s%12s" % ("corpus", "retraining", "update"))
+    batches = [random_corpus(batch_size, 4096, seed) for seed in range(16)]
+    huff_coder = ReusableHuffman(batches[0])
+    for count in range(2, len(batches) + 1):
+        corpus = "".join(batches[:count])
+        batch = batches[count - 1]
+        retrain_time = best_time(lambda: ReusableHuffman(corpus), 1)
+        update_time = best_time(lambda: huff_coder.update(batch), 1)
+        if count & (count - 1) == 0:
+            print("%12d%12.4f%12.4f" % (len(corpus), retrain_time, update_time))
+
+def benchmark_stream_training(chunk_size: int = 50_000) -> None:
+    '''
+    Follows a stream whose char distribution flips halfway through (the most
+    frequent chars becoming the rarest), comparing the compressed size of its
+    chunks under a model trained on the first chunk and under the latest
+    snapshot of StreamTrainers, along with their cost per chunk.
+    '''
+    print("compressed size of a drifting stream of %d character chunks" % chunk_size)
+    print("%20s%12s%12s%12s" % ("model", "1st half", "2nd half", "sec/chunk"))
+    alphabet_size = 256
+    alphabet = "".join(chr(cp) for cp in range(0x21, 0x21 + alphabet_size))
+    flip = str.maketrans(alphabet, alphabet[::-1])
+    chunks = [random_corpus(chunk_size, alphabet_size, seed) for seed in range(16)]
+    chunks[8:] = [chunk.translate(flip) for chunk in chunks[8:]]
+    static = ReusableHuffman(chunks[0])
+    trainers = [("static", None), ("decay 0.5", StreamTrainer(decay=0.5)),
+                ("window 4", StreamTrainer("window", window=4))]
+    for name, trainer in trainers:
+        model, sizes, elapsed = static, [0, 0], 0.0
+        for index, chunk in enumerate(chunks):
+            sizes[index >= 8] += len(model.compress_message(chunk))
+            if trainer is not None:
+                start = time.perf_counter()
+                snapshot = trainer.observe(chunk)
+                elapsed += time.perf_counter() - start
+                assert snapshot is not None
+                model = snapshot.model
+        print("%20s%12d%12d%12.4f" % (name, sizes[0], sizes[1], elapsed / len(chunks)))
+
+class DictNode(HuffmanNode):
+    '''
+    HuffmanNode with a per-instance __dict__, as every node had before
+    HuffmanNode was slotted; kept here as a baseline for comparison.
+    '''
+
+def copy_trie(root: HuffmanNode, node_type: type[HuffmanNode]) -> HuffmanNode:
+    '''
+    Parameters:
+        root (HuffmanNode):
+            The root of the trie to copy
+        node_type (type[HuffmanNode]):
+            The class of the copy's nodes
+    
+    Returns:
+        HuffmanNode:
+            The root of a copy of the trie made of node_type nodes
+    '''
+    copy_root = node_type(root.char, root.freq)
+    stack = [(root, copy_root)]
+    while stack:
+        node, copy_node = stack.pop()
+        if node.zero_child is not None:
+            copy_node.zero_child = node_type(node.zero_child.char, node.zero_child.freq)
+            stack.append((node.zero_child, copy_node.zero_child))
+        if node.one_child is not None:
+            copy_node.one_child = node_type(node.one_child.char, node.one_child.freq)
+            stack.append((node.one_child, copy_node.one_child))
+    return copy_root
+
+def benchmark_trie_memory() -> None:
+    '''
+    Compares the memory held by tries of dict-backed nodes with that of the
+    slotted HuffmanNodes, and reports that of whole trained models: as
+    trained, after compressing (which must not hold the trie) and after
+    decompressing.
+    '''
+    print("memory held by tries and models (MB)")
+    print("%12s%12s%12s%12s%15s%14s%12s" % (
+        "alphabet", "dict trie", "slot trie", "model", "model+encode", "model+decode", "holds trie"))
+    for alphabet_size in [256, 4096, 65536]:
+        frequencies = Counter(random_corpus(alphabet_size * 8, alphabet_size))
+        root = build_trie(frequencies)
+        message = random_corpus(1000, alphabet_size)
+        
+        def encoding_model() -> ReusableHuffman:
+            huff_coder = ReusableHuffman.from_frequencies(frequencies)
+            huff_coder.compress_message(message)
+            return huff_coder
+        
+        def decoding_model() -> ReusableHuffman:
+            huff_coder = encoding_model()
+            huff_coder.get_decode_table()
+            return huff_coder
+        
+        compress_only = encoding_model()
+        print("%12d%12.2f%12.2f%12.2f%15.2f%14.2f%12s" % (
+            alphabet_size,
+            retained_memory(lambda: copy_trie(root, DictNode)) / 1e6,
+            retained_memory(lambda: copy_trie(root, HuffmanNode)) / 1e6,
+            retained_memory(lambda: ReusableHuffman.from_frequencies(frequencies)) / 1e6,
+            retained_memory(encoding_model) / 1e6,
+            retained_memory(decoding_model) / 1e6,
+            any(isinstance(value, HuffmanNode) for value in vars(compress_only).values())))
+
+def benchmark_adaptive(size: int = 200_000) -> None:
+    '''
+    Compares the compression ratio and speed of the adaptive coder with those
+    of the static coder (trained on the message itself, its best case).
+    '''
+    print("adaptive vs. static coding of a %d character message" % size)
+    print("%10s%10s%10s%12s%12s" % ("alphabet", "coder", "ratio", "compress", "decompress"))
+    for alphabet_size in [16, 256, 4096, 16384]:
+        message = random_corpus(size, alphabet_size)
+        original_size = len(message.encode("utf-8"))
+        coders: list[tuple[str, Union[ReusableHuffman, AdaptiveHuffman]]] = [
+            ("static", ReusableHuffman(message)), ("adaptive", AdaptiveHuffman())]
+        for name, coder in coders:
+            compressed_msg = coder.compress_message(message)
+            print("%10d%10s%10.3f%12.4f%12.4f" % (
+                alphabet_size, name, len(compressed_msg) / original_size,
+                best_time(lambda: coder.compress_message(message), 1),
+                best_time(lambda: coder.decompress(compressed_msg), 1)))
+
+BENCHMARKS: dict[str, Callable[[], None]] = {
+    "training": benchmark_training,
+    "trie": benchmark_trie_builders,
+    "trie_memory": benchmark_trie_memory,
+    "tiny": benchmark_tiny_messages,
+    "compress": benchmark_compression,
+    "translate": benchmark_translate,
+    "vector_encoder": benchmark_vector_encoder,
+    "decompress": benchmark_decompression,
+    "vector_decoder": benchmark_vector_decoder,
+    "length_limits": benchmark_length_limits,
+    "model": benchmark_model_loading,
+    "parallel": benchmark_parallel_training,
+    "file_training": benchmark_file_training,
+    "sampled": benchmark_sampled_training,
+    "update": benchmark_updates,
+    "adaptive": benchmark_adaptive,
+    "stream_training": benchmark_stream_training,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
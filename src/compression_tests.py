@@ -1,5 +1,13 @@
 from compression_utils import *
 from byte_utils import *
+from training_utils import *
+from adaptive_utils import *
+from vectorized_utils import *
+import io
+import os
+import pickle
+import sys
+import tempfile
 import unittest
 
 ETB_CHAR = "\x17"
@@ -35,7 +43,208 @@ class CompressionTests(unittest.TestCase):
     # [!] TODO: Write your own constructor tests with a larger variety of
     # characters in the corpus here!
     
+    def test_from_frequencies_t0(self) -> None:
+        huff_coder = ReusableHuffman.from_frequencies({"A": 1, "B": 3, "C": 2})
+        solution = {ETB_CHAR: '100', "A": '101', 'B': '0', 'C': '11'}
+        self.assertEqual(solution, huff_coder.get_encoding_map())
+        self.assertEqual({ETB_CHAR: '0'}, ReusableHuffman.from_frequencies({}).get_encoding_map())
+        self.assertRaises(ValueError, ReusableHuffman.from_frequencies, {"A": -1})
+        self.assertRaises(ValueError, ReusableHuffman.from_frequencies, {"A": 1, "AB": 2})
+        self.assertRaises(ValueError, ReusableHuffman.from_frequencies, {"": 1})
+        
+    def test_from_frequencies_t1(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d" * 3
+        frequencies = count_frequencies(corpus)
+        all_options: list[dict[str, Any]] = [
+            {}, {"construction": "two_queue"}, {"canonical": True}, {"max_code_length": 6}]
+        for options in all_options:
+            huff_coder = ReusableHuffman.from_frequencies(frequencies, **options)
+            self.assertEqual(ReusableHuffman(corpus, **options).get_encoding_map(),
+                             huff_coder.get_encoding_map())
+        # An explicit ETB_CHAR frequency is kept
+        frequencies[ETB_CHAR] = 1000
+        self.assertEqual(1, len(ReusableHuffman.from_frequencies(frequencies).get_encoding_map()[ETB_CHAR]))
+        
+    def test_count_frequencies_t0(self) -> None:
+        self.assertEqual({"A": 1, "B": 3, "C": 2}, count_frequencies("ABBBCC"))
+        self.assertEqual({}, count_frequencies(""))
+        
+    def test_count_frequencies_t1(self) -> None:
+        corpus = "the quick brown fox jumps over the lazy dog \u00e9\u4e2d\U0001f600" * 3
+        solution = {c: corpus.count(c) for c in set(corpus)}
+        self.assertEqual(solution, count_frequencies(corpus))
+        
+    def test_build_trie_heap_t0(self) -> None:
+        corpus = "abracadabra! mississippi, banana bandana" * 2
+        huff_coder = ReusableHuffman(corpus)
+        queue: PriorityQueue[HuffmanNode] = PriorityQueue()
+        queue.put(HuffmanNode(ETB_CHAR, 1))
+        for char, freq in count_frequencies(corpus).items():
+            queue.put(HuffmanNode(char, freq))
+        root = huff_coder.grow_trie(queue)
+        self.assertEqual(huff_coder.create_encoding_map(root, ""), huff_coder.get_encoding_map())
+        
+    def test_build_trie_two_queue_t0(self) -> None:
+        huff_coder = ReusableHuffman("ABBBCC", "two_queue")
+        solution = {ETB_CHAR: '100', "A": '101', 'B': '0', 'C': '11'}
+        self.assertEqual(solution, huff_coder.get_encoding_map())
+        
+    def test_build_trie_two_queue_t1(self) -> None:
+        # Many equal frequencies exercise the tie-breaking between queues
+        corpus = "zyxwvutsrqponmlkjihgfedcba" * 3 + "mmnnoopp" + "QRSTUVWX"
+        self.assertEqual(ReusableHuffman(corpus).get_encoding_map(),
+                         ReusableHuffman(corpus, "two_queue").get_encoding_map())
+        self.assertRaises(ValueError, ReusableHuffman, corpus, "bogus")
+        
+    def test_create_encoding_map_t0(self) -> None:
+        # Degenerate, 10,000-deep trie: every leaf hangs off the zero side
+        depth = 10_000
+        root = HuffmanNode("0", 1)
+        for i in range(1, depth + 1):
+            root = HuffmanNode(str(i), i + 1, HuffmanNode(str(i), 1), root)
+        encoding_map = ReusableHuffman("").create_encoding_map(root, "")
+        self.assertEqual(depth + 1, len(encoding_map))
+        self.assertEqual("0", encoding_map[str(depth)])
+        self.assertEqual("1" * (depth - 1) + "0", encoding_map["1"])
+        self.assertEqual("1" * depth, encoding_map["0"])
+        
+    def test_canonical_t0(self) -> None:
+        huff_coder = ReusableHuffman("ABBBCC", canonical=True)
+        solution = {"B": "0", "C": "10", ETB_CHAR: "110", "A": "111"}
+        self.assertEqual(solution, huff_coder.get_encoding_map())
+        self.assertEqual([("B", 1), ("C", 2), (ETB_CHAR, 3), ("A", 3)], huff_coder.get_code_lengths())
+        compressed_msg = huff_coder.compress_message("BABCBC")
+        self.assertEqual(bitstrings_to_bytes(['01110100', '10110000']), compressed_msg)
+        self.assertEqual("BABCBC", huff_coder.decompress(compressed_msg))
+        
+    def test_canonical_t1(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d" * 3
+        huff_coder = ReusableHuffman(corpus, canonical=True)
+        original = ReusableHuffman(corpus)
+        self.assertEqual(sorted(original.get_code_lengths()), sorted(huff_coder.get_code_lengths()))
+        restored = ReusableHuffman.from_code_lengths(huff_coder.get_code_lengths())
+        self.assertEqual(huff_coder.get_encoding_map(), restored.get_encoding_map())
+        self.assertEqual(corpus, restored.decompress(huff_coder.compress_message(corpus)))
+        self.assertEqual("", ReusableHuffman("", canonical=True).decompress(b'\x00'))
+        self.assertRaises(ValueError, ReusableHuffman.from_code_lengths, [("A", 1)])
+        self.assertRaises(ValueError, ReusableHuffman.from_code_lengths, [(ETB_CHAR, 1), ("A", 1), ("B", 1)])
+        
+    def test_package_merge_t0(self) -> None:
+        self.assertEqual({"A": 2, "B": 2, "C": 2, "D": 2},
+                         package_merge_lengths({"A": 1, "B": 2, "C": 4, "D": 8}, 2))
+        self.assertEqual({"A": 3, "B": 3, "C": 2, "D": 1},
+                         package_merge_lengths({"A": 1, "B": 2, "C": 4, "D": 8}, 3))
+        self.assertRaises(ValueError, package_merge_lengths, {"A": 1, "B": 2, "C": 4}, 1)
+        # The cap is checked even when there are too few chars to need it
+        self.assertRaises(ValueError, package_merge_lengths, {"A": 1}, 0)
+        self.assertRaises(ValueError, ReusableHuffman, "", max_code_length=0)
+        
+    def test_package_merge_t1(self) -> None:
+        # Fibonacci frequencies make the unconstrained trie maximally deep
+        fibonacci = [1, 1]
+        while len(fibonacci) < 30:
+            fibonacci.append(fibonacci[-1] + fibonacci[-2])
+        frequencies = {chr(ord("A") + i): freq for i, freq in enumerate(fibonacci)}
+        self.assertEqual(29, max(trie_code_lengths(build_trie(frequencies)).values()))
+        code_lengths = package_merge_lengths(frequencies, 12)
+        self.assertEqual(12, max(code_lengths.values()))
+        self.assertEqual(1.0, sum(2.0 ** -length for length in code_lengths.values()))
+        self.assertGreater(length_limit_cost(frequencies, 12), 0)
+        self.assertEqual(0, length_limit_cost(frequencies, 29))
+        
+    def test_max_code_length_t0(self) -> None:
+        corpus = "".join(char * (2 ** i) for i, char in enumerate("ABCDEFGHIJ"))
+        huff_coder = ReusableHuffman(corpus, max_code_length=5)
+        self.assertEqual(5, max(length for _, length in huff_coder.get_code_lengths()))
+        self.assertEqual(corpus, huff_coder.decompress(huff_coder.compress_message(corpus)))
+        self.assertRaises(ValueError, ReusableHuffman, corpus, max_code_length=3)
+        
+    def test_save_model_t0(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d\U0001f600" * 3
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.huf")
+            for huff_coder in [ReusableHuffman(corpus), ReusableHuffman(corpus, canonical=True),
+                               ReusableHuffman("")]:
+                huff_coder.save_model(path)
+                restored = ReusableHuffman.load_model(path)
+                self.assertEqual(huff_coder.get_encoding_map(), restored.get_encoding_map())
+                compressed_msg = huff_coder.compress_message(corpus)
+                self.assertEqual(compressed_msg, restored.compress_message(corpus))
+                self.assertEqual(huff_coder.decompress(compressed_msg), restored.decompress(compressed_msg))
+            # Canonical models store only a header, chars and lengths
+            ReusableHuffman(corpus, canonical=True).save_model(path)
+            self.assertEqual(12 + 6 * len(set(corpus + ETB_CHAR)), os.path.getsize(path))
+            
+    def test_pickle_t0(self) -> None:
+        huff_coder = ReusableHuffman("ABBBCC")
+        restored = pickle.loads(pickle.dumps(huff_coder))
+        self.assertEqual(huff_coder.get_encoding_map(), restored.get_encoding_map())
+        self.assertEqual("BABCBC", restored.decompress(restored.compress_message("BABCBC")))
+        
+    def test_save_model_t1(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.huf")
+            ReusableHuffman("ABBBCC").save_model(path)
+            with open(path, "rb") as model_file:
+                complete = model_file.read()
+            # Valid headers followed by truncated tables or code bits
+            truncated = [b"HUFM\x01\x00\x00\x00\xff\x00\x00\x00", complete[:-1], complete[:-4]]
+            for contents in [b"", b"HUF", b"NOPE" + bytes(8), b"HUFM\x09" + bytes(7)] + truncated:
+                with open(path, "wb") as model_file:
+                    model_file.write(contents)
+                self.assertRaises(ValueError, ReusableHuffman.load_model, path)
+        
+    def test_update_t0(self) -> None:
+        huff_coder = ReusableHuffman("ABBB")
+        self.assertTrue(huff_coder.update("CC"))
+        self.assertEqual(ReusableHuffman("ABBBCC").get_encoding_map(), huff_coder.get_encoding_map())
+        self.assertEqual(0, huff_coder.drift())
+        # The ETB_CHAR keeps a frequency of 1 however often the text has it
+        corpus = "ABBB" + ETB_CHAR * 3
+        self.assertEqual({"A": 1, "B": 3, ETB_CHAR: 1}, counts_to_frequencies(count_frequencies(corpus)))
+        huff_coder.update(ETB_CHAR * 3, rebuild_every=0)
+        self.assertEqual(0, huff_coder.drift())
+        
+    def test_update_t1(self) -> None:
+        huff_coder = ReusableHuffman("ABBBCC", canonical=True)
+        encoding_map = huff_coder.get_encoding_map()
+        self.assertFalse(huff_coder.update("AAAA", rebuild_every=2))
+        self.assertEqual(encoding_map, huff_coder.get_encoding_map())
+        self.assertGreater(huff_coder.drift(), 0)
+        self.assertTrue(huff_coder.update("AAAA", rebuild_every=2))
+        solution = ReusableHuffman("ABBBCCAAAAAAAA", canonical=True).get_encoding_map()
+        self.assertEqual(solution, huff_coder.get_encoding_map())
+        # A char without a code is infinite drift
+        self.assertFalse(huff_coder.update("AB", rebuild_every=0, max_drift=0.5))
+        self.assertTrue(huff_coder.update("D", rebuild_every=0, max_drift=0.5))
+        self.assertIn("D", huff_coder.get_encoding_map())
+        restored = ReusableHuffman.from_code_lengths(huff_coder.get_code_lengths())
+        self.assertRaises(ValueError, restored.update, "ABC")
+        
+    def test_get_encoding_map_t0(self) -> None:
+        huff_coder = ReusableHuffman("ABBBCC")
+        encoding_map = huff_coder.get_encoding_map()
+        encoding_map["B"] = "111"
+        # Mutating the returned copy must not affect compression
+        solution = bitstrings_to_bytes(['10100011', '11100000'])
+        self.assertEqual(solution, huff_coder.compress_message("ABBBCC"))
+        self.assertEqual("0", huff_coder.get_encoding_map()["B"])
+        
+    def test_huffman_node_t0(self) -> None:
+        # Nodes are slotted, with no per-instance __dict__
+        for node in [HuffmanNode("A", 1), AdaptiveNode("A", None, 0)]:
+            self.assertFalse(hasattr(node, "__dict__"))
+            self.assertRaises(AttributeError, setattr, node, "bogus", 0)
     
+    def test_huffman_node_t1(self) -> None:
+        # Trained models do not hold on to their trie, even while compressing
+        for construction in ["heap", "two_queue"]:
+            huff_coder = ReusableHuffman("ABBBCC", construction=construction)
+            huff_coder.compress_message("ABC")
+            self.assertFalse(any(isinstance(value, HuffmanNode) for value in vars(huff_coder).values()))
+            self.assertEqual("ABC", huff_coder.decompress(huff_coder.compress_message("ABC")))
+
+
     # Compression Tests
     # ---------------------------------------------------------------------------
     def test_compression_t0(self) -> None:
@@ -80,10 +289,61 @@ class CompressionTests(unittest.TestCase):
         solution = bitstrings_to_bytes(['01010110', '11100000'])
         self.assertEqual(solution, compressed_message)
         
+    def test_compression_t5(self) -> None:
+        huff_coder = ReusableHuffman("AB")
+        # byte 0: 0000 0010 (10 = ETB, 11 = 'A', 0 = 'B')
+        # [!] Message and ETB fill the byte exactly, so there is no padding
+        compressed_message = huff_coder.compress_message("BBBBBB")
+        solution = bitstrings_to_bytes(['00000010'])
+        self.assertEqual(solution, compressed_message)
+        
+    def test_compression_t6(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d"
+        huff_coder = ReusableHuffman(corpus)
+        encoding_map = huff_coder.get_encoding_map()
+        message = corpus * 40
+        bits = "".join(encoding_map[c] for c in message + ETB_CHAR)
+        bits += "0" * (-len(bits) % 8)
+        solution = bitstrings_to_bytes([bits[i:i + 8] for i in range(0, len(bits), 8)])
+        self.assertEqual(solution, huff_coder.compress_message(message))
+        # Characters missing from the corpus are skipped
+        self.assertEqual(solution, huff_coder.compress_message(message + "~~~"))
+    
+    def test_compress_stream_t0(self) -> None:
+        huff_coder = ReusableHuffman("ABBBCC")
+        solution = bitstrings_to_bytes(['10100011', '11100000'])
+        self.assertEqual(solution, b"".join(huff_coder.compress_stream(["ABB", "", "BCC"])))
+        self.assertEqual(bitstrings_to_bytes(['10000000']), b"".join(huff_coder.compress_stream([])))
+        
+    def test_compress_stream_t1(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d"
+        huff_coder = ReusableHuffman(corpus)
+        message = corpus * 50
+        solution = huff_coder.compress_message(message)
+        for chunk_size in [1, 3, 7, 64, 10_000]:
+            with io.StringIO(message) as source:
+                pieces = list(huff_coder.compress_stream(source, chunk_size))
+            self.assertEqual(solution, b"".join(pieces))
+        self.assertEqual(solution, b"".join(huff_coder.compress_stream(iter(message))))
+    
     # [!] TODO: Write your own compression tests with a greater variety of chars
     # in the corpus
     
     
+    def test_translation_t0(self) -> None:
+        corpus = "It was the best of times, it was the worst of times"
+        huff_coder = ReusableHuffman(corpus)
+        self.assertEqual("1010", "ABZ".translate(CodeTranslation({ord("A"): "101", ord("B"): "0"})))
+        # Matches packing the codes one char at a time, skipping chars without
+        # a code, including across TRANSLATE_CHUNK_SIZE boundaries
+        code_table = {char: (int(code, 2), len(code)) for char, code in huff_coder.get_encoding_map().items()}
+        long_message = corpus * (TRANSLATE_CHUNK_SIZE // len(corpus) + 2)
+        for message in [corpus, corpus + "\u00e9", "\u4e2d" + corpus, "Jq", long_message]:
+            compressed_msg = bytearray()
+            acc, acc_bits = pack_codes(code_table, message + ETB_CHAR, compressed_msg)
+            pad_bits(compressed_msg, acc, acc_bits)
+            self.assertEqual(bytes(compressed_msg), huff_coder.compress_message(message))
+        
     # Decompression Tests
     # ---------------------------------------------------------------------------
     
@@ -124,8 +384,289 @@ class CompressionTests(unittest.TestCase):
         compressed_msg: bytes = bitstrings_to_bytes(['01010110', '11100000'])
         self.assertEqual("BABCBC", huff_coder.decompress(compressed_msg))
         
+    def test_decompression_t5(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d" * 3 + "qqzzzj"
+        message = corpus[::-1] * 5
+        for bits in [1, 2, 3, 8, 10, 12]:
+            huff_coder = ReusableHuffman(corpus, decode_table_bits=bits)
+            self.assertEqual(message, huff_coder.decompress(huff_coder.compress_message(message)))
+        self.assertEqual("", ReusableHuffman("").decompress(bitstrings_to_bytes(['00000000'])))
+        self.assertRaises(ValueError, ReusableHuffman, corpus, decode_table_bits=0)
+        
+    def test_decompression_t6(self) -> None:
+        # Codes far longer than a table lookup go through nested subtables
+        depth = 1000
+        root = HuffmanNode("0", 1)
+        for i in range(1, depth + 1):
+            root = HuffmanNode(str(i), i + 1, HuffmanNode(str(i), 1), root)
+        encoding_map = ReusableHuffman("").create_encoding_map(root, "")
+        message = ["0", "1", "500", str(depth), "0"]
+        bits = "".join(encoding_map[c] for c in message)
+        padding = -len(bits) % 8
+        bits += "0" * padding
+        compressed_msg = bitstrings_to_bytes([bits[i:i + 8] for i in range(0, len(bits), 8)])
+        decoded: list[str] = []
+        decode_bits(build_decode_table(root, 8), compressed_msg, decoded)
+        # Without an ETB_CHAR, each 0 bit of padding decodes as the char with code 0
+        self.assertEqual(message + [str(depth)] * padding, decoded)
+    
+    def test_stream_decoder_t0(self) -> None:
+        decoder = ReusableHuffman("ABBBCC").decoder()
+        self.assertEqual("ABBBC", decoder.feed(bitstrings_to_bytes(['10100011'])))
+        self.assertFalse(decoder.done)
+        self.assertEqual("C", decoder.feed(bitstrings_to_bytes(['11100000'])))
+        self.assertTrue(decoder.done)
+        self.assertEqual("", decoder.feed(bitstrings_to_bytes(['00000000'])))
+        self.assertEqual("", decoder.flush())
+        self.assertFalse(decoder.done)
+        self.assertEqual("BABCBC", decoder.feed(bitstrings_to_bytes(['01010110', '11100000'])))
+        
+    def test_stream_decoder_t1(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d"
+        huff_coder = ReusableHuffman(corpus, decode_table_bits=4)
+        message = corpus * 50
+        compressed_msg = huff_coder.compress_message(message)
+        for piece_size in [1, 2, 5, 64]:
+            decoder = huff_coder.decoder()
+            pieces = [decoder.feed(compressed_msg[i:i + piece_size])
+                      for i in range(0, len(compressed_msg), piece_size)]
+            self.assertEqual(message, "".join(pieces))
+            self.assertTrue(decoder.done)
+    
     # [!] TODO: Write your own decompression tests with a greater variety of chars
     # in the corpus
         
+    # Byte Utility Tests
+    # ---------------------------------------------------------------------------
+    
+    def test_byte_to_bitstring_t0(self) -> None:
+        self.assertEqual("10100010", byte_to_bitstring(0xa2))
+        self.assertEqual("00000011", byte_to_bitstring(3))
+        self.assertEqual([format(b, "08b") for b in range(256)],
+                         [byte_to_bitstring(b) for b in range(256)])
+        # Conversions no longer depend on the third-party bitstring package
+        self.assertNotIn("bitstring", sys.modules)
+        
+    def test_bytes_to_bitstring_t0(self) -> None:
+        self.assertEqual("1010001000000011", bytes_to_bitstring(b'\xa2\x03'))
+        self.assertEqual("", bytes_to_bitstring(b''))
+        
+    def test_bitstring_to_bytes_t0(self) -> None:
+        self.assertEqual(b'\xa3\xe0', bitstring_to_bytes('1010001111100'))
+        self.assertEqual(b'\x00\x01', bitstring_to_bytes('0000000000000001'))
+        self.assertEqual(b'', bitstring_to_bytes(''))
+        data = bytes(range(256))
+        self.assertEqual(data, bitstring_to_bytes(bytes_to_bitstring(data)))
+        
+    # Training Tests
+    # ---------------------------------------------------------------------------
+    
+    def test_train_parallel_t0(self) -> None:
+        corpus = "It was the best of times,\r\nit was the worst \u00e9\u4e2d\U0001f600" * 50
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.txt")
+            with open(path, "w", encoding="utf-8", newline="") as corpus_file:
+                corpus_file.write(corpus)
+            solution = ReusableHuffman(corpus).get_encoding_map()
+            # Odd worker counts split the file inside multi-byte characters
+            for workers in [1, 3, 7]:
+                self.assertEqual(solution, train_parallel(path, workers).get_encoding_map())
+            shards = []
+            for i, shard in enumerate([corpus[:1000], corpus[1000:], ""]):
+                shards.append(os.path.join(directory, "shard-%d.txt" % i))
+                with open(shards[-1], "w", encoding="utf-8", newline="") as shard_file:
+                    shard_file.write(shard)
+            self.assertEqual(solution, train_parallel(shards, 2).get_encoding_map())
+            self.assertEqual({ETB_CHAR: '0'}, train_parallel(shards[-1:]).get_encoding_map())
+            
+    def test_train_from_file_t0(self) -> None:
+        corpus = "It was the best of times,\r\nit was the worst \u00e9\u4e2d\U0001f600" * 50
+        solution = ReusableHuffman(corpus).get_encoding_map()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.txt")
+            for encoding in ["utf-8", "utf-16"]:
+                with open(path, "w", encoding=encoding, newline="") as corpus_file:
+                    corpus_file.write(corpus)
+                # Small windows split multi-byte characters between windows
+                for window_size in [1, 3, 1 << 22]:
+                    huff_coder = train_from_file(path, window_size, encoding)
+                    self.assertEqual(solution, huff_coder.get_encoding_map())
+            open(path, "w").close()
+            self.assertEqual({ETB_CHAR: '0'}, train_from_file(path).get_encoding_map())
+            
+    def test_train_sampled_t0(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d" * 20
+        # A sample as large as the corpus is the corpus itself
+        result = train_sampled(corpus, len(corpus))
+        self.assertEqual(ReusableHuffman(corpus).get_encoding_map(), result.model.get_encoding_map())
+        self.assertEqual((len(corpus), len(corpus)), (result.sample_size, result.corpus_size))
+        for method in ["random", "stratified"]:
+            result = train_sampled(corpus, 50, method, seed=2130, alphabet="~")
+            sample, _ = sample_chars(corpus, 50, method, seed=2130)
+            self.assertEqual(50, result.sample_size)
+            # Every char of the corpus has a code, sampled or not
+            self.assertTrue(set(sample) < set(corpus))
+            self.assertEqual(set(corpus) | {"~", ETB_CHAR}, set(result.model.get_encoding_map()))
+            self.assertGreaterEqual(result.estimated_ratio_loss, 0)
+        self.assertRaises(ValueError, sample_chars, corpus, 50, "bogus")
+        
+    def test_train_sampled_t1(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d" * 20
+        chunks = [corpus[i:i + 7] for i in range(0, len(corpus), 7)]
+        sample, corpus_size = sample_chars(iter(chunks), 100, seed=2130)
+        self.assertEqual((100, len(corpus)), (len(sample), corpus_size))
+        self.assertTrue(set(sample) <= set(corpus))
+        self.assertEqual(sorted(corpus), sorted(sample_chars(chunks, len(corpus))[0]))
+        self.assertRaises(ValueError, sample_chars, chunks, 100, "stratified")
+        # The stream is sampled identically, so every sampled char has a code
+        model = train_sampled(iter(chunks), 100, seed=2130).model
+        message = "".join(sample)
+        self.assertEqual(message, model.decompress(model.compress_message(message)))
+        
+    def test_train_sampled_t2(self) -> None:
+        # A char too rare to be sampled still round-trips
+        chunks = ["abc" * 1000 + "Z"] + ["abc" * 1000] * 9
+        distinct: set[str] = set()
+        sample, _ = sample_chars(iter(chunks), 1000, seed=2130, distinct=distinct)
+        self.assertNotIn("Z", sample)
+        self.assertEqual({"a", "b", "c", "Z"}, distinct)
+        result = train_sampled(iter(chunks), 1000, seed=2130)
+        self.assertEqual("abcZ", result.model.decompress(result.model.compress_message("abcZ")))
+        # No char of the sample is a singleton, so nothing is estimated unseen
+        self.assertEqual(0, result.unseen_mass)
+        self.assertEqual(0.5, estimate_unseen_mass("aabc"))
+        self.assertEqual(0, train_sampled("abcZ", 10).unseen_mass)
+            
+    def test_stream_trainer_t0(self) -> None:
+        chunks = ["AAAB", "ABBC", "CCCD", "DDDA"]
+        trainer = StreamTrainer("window", window=2, snapshot_every=2)
+        self.assertIsNone(trainer.observe(chunks[0]))
+        snapshot = trainer.observe(chunks[1])
+        assert snapshot is not None
+        self.assertEqual(1, snapshot.version)
+        self.assertEqual(ReusableHuffman("".join(chunks[:2])).get_encoding_map(), snapshot.model.get_encoding_map())
+        # Only the latest 2 chunks are counted
+        trainer.observe(chunks[2])
+        snapshot = trainer.observe(chunks[3])
+        assert snapshot is not None
+        self.assertEqual(2, snapshot.version)
+        self.assertEqual({"A": 1, "C": 3, "D": 4}, trainer.counts())
+        self.assertEqual(ReusableHuffman("".join(chunks[2:])).get_encoding_map(), snapshot.model.get_encoding_map())
+        self.assertRaises(ValueError, StreamTrainer, "bogus")
+        
+    def test_stream_trainer_t1(self) -> None:
+        trainer = StreamTrainer(decay=0.5, min_weight=0.25)
+        trainer.observe("AAAAAAAA")
+        trainer.observe("BB")
+        self.assertEqual({"A": 4, "B": 2}, trainer.counts())
+        for _ in range(4):
+            trainer.observe("C")
+        # A's count has decayed to 0.25 and B's below min_weight
+        self.assertEqual({"A": 0.25, "C": 1.875}, trainer.counts())
+        snapshot = trainer.snapshot()
+        self.assertEqual(7, snapshot.version)
+        self.assertEqual({"A", "C", ETB_CHAR}, set(snapshot.model.get_encoding_map()))
+        # Without decay, the counts are those of the whole stream
+        trainer = StreamTrainer(decay=1.0)
+        for _ in range(300):
+            trainer.observe("ABBCCC")
+        self.assertEqual({"A": 300, "B": 600, "C": 900}, trainer.counts())
+        
+    # Adaptive Huffman Tests
+    # ---------------------------------------------------------------------------
+    
+    def test_adaptive_t0(self) -> None:
+        huff_coder = AdaptiveHuffman()
+        # 'A' as raw UTF-8 (the NYT code is empty); 'B' as NYT (0) + raw;
+        # 'B' (01); ETB as NYT (00) + raw; padding
+        compressed_msg = huff_coder.compress_message("ABB")
+        solution = bitstrings_to_bytes(['01000001', '00100001', '00100000', '10111000'])
+        self.assertEqual(solution, compressed_msg)
+        self.assertEqual("ABB", huff_coder.decompress(compressed_msg))
+        self.assertEqual("", huff_coder.decompress(huff_coder.compress_message("")))
+        
+    def test_adaptive_t1(self) -> None:
+        huff_coder = AdaptiveHuffman()
+        message = "It was the best of times, it was the worst of times \u00e9\u4e2d\U0001f600" * 20
+        compressed_msg = huff_coder.compress_message(message)
+        self.assertLess(len(compressed_msg), len(message))
+        self.assertEqual(message, huff_coder.decompress(compressed_msg))
+        chunks = [message[i:i + 7] for i in range(0, len(message), 7)]
+        self.assertEqual(compressed_msg, b"".join(huff_coder.compress_stream(chunks)))
+        decoder = huff_coder.decoder()
+        pieces = [decoder.feed(compressed_msg[i:i + 3]) for i in range(0, len(compressed_msg), 3)]
+        self.assertEqual(message, "".join(pieces))
+        self.assertTrue(decoder.done)
+        
+    def test_adaptive_t2(self) -> None:
+        # Nodes stay ordered by frequency, and each frequency's leader is the
+        # first node of that frequency
+        trie = AdaptiveTrie()
+        for char in "abracadabra" * 5 + "".join(map(chr, range(0x100, 0x140))) * 3:
+            trie.increment(char)
+            freqs = [node.freq for node in trie.nodes]
+            self.assertEqual(sorted(freqs, reverse=True), freqs)
+            self.assertEqual({freq: freqs.index(freq) for freq in freqs}, trie.leaders)
+        
+    # Vectorized Engine Tests
+    # ---------------------------------------------------------------------------
+    
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_vector_encoder_t0(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d\U0001f600" * 3
+        huff_coder = ReusableHuffman(corpus)
+        # Chars without a code ("~", the lone surrogate) are skipped
+        for message in [corpus, "", "~", "~\ud800" + corpus[:40] + "~"]:
+            for chunk_size in [1, 7, 1 << 16]:
+                encoder = VectorEncoder(huff_coder, chunk_size)
+                self.assertTrue(encoder.vectorized)
+                self.assertEqual(huff_coder.compress_message(message), encoder.compress_message(message))
+        
+    def test_vector_encoder_t1(self) -> None:
+        # Codes longer than 64 bits are compressed by the model itself
+        code_lengths = [(chr(0x21 + i), i + 1) for i in range(69)] + [("~", 70), (ETB_CHAR, 70)]
+        huff_coder = ReusableHuffman.from_code_lengths(code_lengths)
+        encoder = VectorEncoder(huff_coder)
+        self.assertFalse(encoder.vectorized)
+        message = "!\"~f!"
+        self.assertEqual(huff_coder.compress_message(message), encoder.compress_message(message))
+        
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_vector_decoder_t0(self) -> None:
+        corpus = "It was the best of times, it was the worst of times \u00e9\u4e2d\U0001f600" * 3
+        huff_coder = ReusableHuffman(corpus)
+        compressed_msg = huff_coder.compress_message(corpus)
+        # Segments and chunks that start mid-code must be retraced correctly
+        for chunk_size, segment_size in [(1, 1), (7, 3), (1 << 20, 256)]:
+            decoder = VectorDecoder(huff_coder, chunk_size, segment_size)
+            self.assertTrue(decoder.vectorized)
+            self.assertEqual(corpus, decoder.decompress(compressed_msg))
+            # Decoding stops at the ETB_CHAR, ignoring any bytes after it
+            self.assertEqual(corpus, decoder.decompress(compressed_msg + b"\xff\x00"))
+            self.assertEqual("", decoder.decompress(b""))
+        
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_vector_decoder_t1(self) -> None:
+        # Codes 'A' (0) and ETB (100) leave bits that start no code (11, 101),
+        # which end decoding like the ETB_CHAR
+        huff_coder = ReusableHuffman.from_code_lengths([("A", 1), (ETB_CHAR, 3)])
+        decoder = VectorDecoder(huff_coder)
+        for compressed_msg, solution in [(b"\x20", "AA"), (b"\x60\x00", "A"), (b"\x14\x00", "AAA"), (b"\xff", "")]:
+            self.assertEqual(solution, huff_coder.decompress(compressed_msg))
+            self.assertEqual(solution, decoder.decompress(compressed_msg))
+        
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_vector_decoder_t2(self) -> None:
+        # Fixed-length codes never resynchronize, so segments that start
+        # mid-code are only traced correctly in order
+        message = "abcdefg" * 2000 + "gfedcba" * 2000
+        for huff_coder in [ReusableHuffman(message, max_code_length=3),
+                           ReusableHuffman.from_code_lengths([(char, 3) for char in "abcdefg" + ETB_CHAR])]:
+            self.assertEqual({3}, {len(code) for code in huff_coder.get_encoding_map().values()})
+            compressed_msg = huff_coder.compress_message(message)
+            for chunk_size, segment_size in [(1 << 20, 128), (1000, 7), (7, 7)]:
+                decoder = VectorDecoder(huff_coder, chunk_size, segment_size)
+                self.assertEqual(message, decoder.decompress(compressed_msg))
+        
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,4 +1,11 @@
-import copy
+import bisect
+import heapq
+import io
+import itertools
+import struct
+from collections import Counter
+from operator import itemgetter
+from types import MappingProxyType
 from queue import *
 from dataclasses import *
 from typing import *
@@ -8,12 +15,28 @@ from byte_utils import *
 # Character -- use this constant to signal the end of a message
 ETB_CHAR = "\x17"
 
+# Binary model files (see: ReusableHuffman.save_model) start with this header:
+# magic, format version, flags, reserved, and the number of chars in the model
+MODEL_MAGIC = b"HUFM"
+MODEL_VERSION = 1
+MODEL_HEADER = struct.Struct("<4sBBHI")
+# Flag set when the codes are canonical, and so are not stored in the file
+MODEL_CANONICAL = 0x01
+
+# Messages are translated into bitstrings this many chars at a time, which
+# bounds the size of the bitstrings (see: ReusableHuffman._pack)
+TRANSLATE_CHUNK_SIZE = 1 << 16
+
 class HuffmanNode:
     '''
     HuffmanNode class to be used in construction of the Huffman Trie
     employed by the ReusableHuffman encoder/decoder below.
     '''
     
+    # Slotted, since a trie over a large alphabet has hundreds of thousands of
+    # nodes, each of which would otherwise carry its own __dict__
+    __slots__ = ("char", "freq", "zero_child", "one_child")
+    
     # Educational Note: traditional constructor rather than dataclass because of need
     # to set default values for children parameters
     def __init__(self, char: str, freq: int, 
@@ -57,6 +80,521 @@ class HuffmanNode:
     def __eq__(self, other: Any) -> bool:
         return bool(self.freq == other.freq)
 
+def count_frequencies(corpus: str) -> dict[str, int]:
+    '''
+    Counts how many times each distinct character appears in the given corpus
+    in a single linear pass, rather than one full scan per distinct character.
+    
+    Parameters:
+        corpus (str):
+            The text whose characters should be counted
+    
+    Returns:
+        dict[str, int]:
+            Maps each character in the corpus to its number of occurrences;
+            identical to {c: corpus.count(c) for c in set(corpus)}
+    
+    Example:
+        count_frequencies("ABBBCC")
+        => {"A": 1, "B": 3, "C": 2}
+    '''
+    return dict(Counter(corpus))
+
+def counts_to_frequencies(counts: Mapping[str, int]) -> dict[str, int]:
+    '''
+    Turns the char counts of training text into the frequencies a model is
+    trained on: the ETB_CHAR ends each message once rather than being part
+    of its text, so its frequency is 1 however often it was counted.
+    
+    Parameters:
+        counts (Mapping[str, int]):
+            Maps each char to its number of occurrences in the training text
+    
+    Returns:
+        dict[str, int]:
+            A copy of the counts with the ETB_CHAR's set to 1
+    
+    Example:
+        counts_to_frequencies({"A": 1, "B": 3, ETB_CHAR: 5})
+        => {"A": 1, "B": 3, ETB_CHAR: 1}
+    '''
+    frequencies = dict(counts)
+    frequencies[ETB_CHAR] = 1
+    return frequencies
+
+def merge_nodes(zero_item: HuffmanNode, one_item: HuffmanNode) -> HuffmanNode:
+    '''
+    Joins two subtries under a new parent whose frequency is their sum, and
+    whose char is the lesser of the two children's, which is what lets
+    HuffmanNode.__lt__ break frequency ties deterministically.
+    
+    Parameters:
+        zero_item, one_item (HuffmanNode):
+            The subtries to become the zero_child and one_child of the parent
+    
+    Returns:
+        HuffmanNode:
+            The new parent node
+    '''
+    new_char = min(zero_item.char, one_item.char)
+    return HuffmanNode(new_char, zero_item.freq + one_item.freq, zero_item, one_item)
+
+def build_trie_heap(leaves: list[HuffmanNode]) -> HuffmanNode:
+    '''
+    Builds the Huffman Trie from the given leaves by repeatedly merging the two
+    least nodes of a binary heap. Performs exactly the same merges, in the same
+    order, as ReusableHuffman.grow_trie does through a PriorityQueue, but
+    without that class' locking overhead, which is wasted on a single thread.
+    
+    Parameters:
+        leaves (list[HuffmanNode]):
+            The leaf nodes of the trie, in any order; the list is consumed
+            (heapified and emptied) in the process
+    
+    Returns:
+        HuffmanNode:
+            The root of the completed trie
+    '''
+    heapq.heapify(leaves)
+    while len(leaves) > 1:
+        zero_item = heapq.heappop(leaves)
+        one_item = heapq.heappop(leaves)
+        heapq.heappush(leaves, merge_nodes(zero_item, one_item))
+    return leaves[0]
+
+def build_trie_two_queue(sorted_leaves: list[HuffmanNode]) -> HuffmanNode:
+    '''
+    Builds the Huffman Trie from leaves that are already sorted (ascending,
+    per HuffmanNode.__lt__) using the classic two-queue method: since merged
+    nodes are created in order of nondecreasing frequency, the least remaining
+    node is always at the front of either the leaf queue or the merged queue,
+    so no heap is needed. Produces the same trie as build_trie_heap.
+    
+    Parameters:
+        sorted_leaves (list[HuffmanNode]):
+            The leaf nodes of the trie, sorted from least to greatest
+    
+    Returns:
+        HuffmanNode:
+            The root of the completed trie
+    '''
+    merged: list[HuffmanNode] = []
+    leaf_index, merged_index = 0, 0
+    leaf_count = len(sorted_leaves)
+    for _ in range(leaf_count - 1):
+        pair: list[HuffmanNode] = []
+        while len(pair) < 2:
+            if merged_index < len(merged) and (leaf_index == leaf_count or
+                                               merged[merged_index] < sorted_leaves[leaf_index]):
+                pair.append(merged[merged_index])
+                merged_index += 1
+            else:
+                pair.append(sorted_leaves[leaf_index])
+                leaf_index += 1
+        # Merged nodes of equal frequency may arrive out of char order, so
+        # insert (rather than append) to keep the tie-breaking of the heap
+        bisect.insort(merged, merge_nodes(pair[0], pair[1]), lo=merged_index)
+    return merged[-1] if merged else sorted_leaves[0]
+
+def build_trie(frequencies: Mapping[str, int], construction: str = "heap") -> HuffmanNode:
+    '''
+    Builds the Huffman Trie for the given char frequencies.
+    
+    Parameters:
+        frequencies (Mapping[str, int]):
+            Maps each char (the ETB_CHAR included) to its frequency
+        construction (str):
+            "heap" (see build_trie_heap) or "two_queue" (see
+            build_trie_two_queue); both yield the same trie
+    
+    Returns:
+        HuffmanNode:
+            The root of the completed trie
+    '''
+    leaves = [HuffmanNode(char, freq) for char, freq in frequencies.items()]
+    if construction == "heap":
+        return build_trie_heap(leaves)
+    if construction == "two_queue":
+        return build_trie_two_queue(sorted(leaves))
+    raise ValueError("Unknown trie construction: " + repr(construction))
+
+def trie_code_lengths(root: HuffmanNode) -> dict[str, int]:
+    '''
+    Finds the depth of every leaf of the given trie, i.e., the length of its
+    char's code, iteratively to support deep tries.
+    
+    Parameters:
+        root (HuffmanNode):
+            The root of the trie to measure
+    
+    Returns:
+        dict[str, int]:
+            Maps each leaf's char to its depth in the trie
+    '''
+    code_lengths: dict[str, int] = {}
+    stack: list[tuple[HuffmanNode, int]] = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if node.is_leaf():
+            code_lengths[node.char] = depth
+        stack.extend((child, depth + 1) for child in (node.zero_child, node.one_child) if child is not None)
+    return code_lengths
+
+def huffman_lengths(counts: Mapping[str, int]) -> dict[str, int]:
+    '''
+    Parameters:
+        counts (Mapping[str, int]):
+            Maps each char to its frequency
+    
+    Returns:
+        dict[str, int]:
+            The code length that a Huffman code for these frequencies gives
+            each char
+    '''
+    if len(counts) < 2:
+        return {char: 1 for char in counts}
+    return trie_code_lengths(build_trie(counts))
+
+def package_merge_lengths(frequencies: Mapping[str, int], max_length: int) -> dict[str, int]:
+    '''
+    Finds optimal code lengths for the given char frequencies subject to no
+    code being longer than max_length bits, using the package-merge algorithm:
+    each of max_length - 1 rounds pairs up ("packages") the cheapest items of
+    the previous round and merges the packages with the original chars; the
+    number of times a char appears among the 2n - 2 cheapest final items is
+    its code length.
+    
+    Parameters:
+        frequencies (Mapping[str, int]):
+            Maps each char (the ETB_CHAR included) to its frequency
+        max_length (int):
+            The longest allowed code, which must leave room for every char
+            (i.e., 2 ** max_length >= len(frequencies))
+    
+    Returns:
+        dict[str, int]:
+            Maps each char to the length of its code
+    
+    Example:
+        package_merge_lengths({"A": 1, "B": 2, "C": 4, "D": 8}, 2)
+        => {"A": 2, "B": 2, "C": 2, "D": 2}
+    '''
+    if max_length < 1:
+        raise ValueError("max_length must be positive")
+    chars = sorted(frequencies, key=lambda char: (frequencies[char], char))
+    if len(chars) <= 2:
+        return {char: 1 for char in chars}
+    if 1 << max_length < len(chars):
+        raise ValueError("max_length is too short to give every char a code")
+    
+    # Items are (weight, node id) pairs; ids below len(chars) are chars, and
+    # the others are packages whose two parts are recorded in packages
+    originals = [(frequencies[char], index) for index, char in enumerate(chars)]
+    packages: list[tuple[int, int]] = []
+    items = originals
+    for _ in range(max_length - 1):
+        paired: list[tuple[int, int]] = []
+        for i in range(0, len(items) - 1, 2):
+            paired.append((items[i][0] + items[i + 1][0], len(chars) + len(packages)))
+            packages.append((items[i][1], items[i + 1][1]))
+        # Stable merge that places originals before packages of equal weight
+        items = sorted(originals + paired, key=lambda item: item[0])
+    
+    counts = [0] * len(chars)
+    stack = [node for _, node in items[:2 * len(chars) - 2]]
+    while stack:
+        node = stack.pop()
+        if node < len(chars):
+            counts[node] += 1
+        else:
+            stack.extend(packages[node - len(chars)])
+    return {char: counts[index] for index, char in enumerate(chars)}
+
+def average_code_length(frequencies: Mapping[str, int], code_lengths: Mapping[str, int]) -> float:
+    '''
+    Parameters:
+        frequencies (Mapping[str, int]):
+            Maps each char to its frequency
+        code_lengths (Mapping[str, int]):
+            Maps each char to the length of its code
+    
+    Returns:
+        float:
+            The average number of bits per char spent encoding text with the
+            given char frequencies
+    '''
+    total = sum(frequencies.values())
+    return sum(freq * code_lengths[char] for char, freq in frequencies.items()) / total if total else 0.0
+
+def length_limit_cost(frequencies: Mapping[str, int], max_length: int) -> float:
+    '''
+    Reports how much capping code lengths at max_length costs in compression
+    ratio, relative to the unconstrained Huffman code.
+    
+    Parameters:
+        frequencies (Mapping[str, int]):
+            Maps each char (the ETB_CHAR included) to its frequency
+        max_length (int):
+            The longest allowed code (see: package_merge_lengths)
+    
+    Returns:
+        float:
+            The fractional growth of the compressed size, e.g., 0.01 when the
+            length-limited code produces 1% more bits
+    '''
+    unlimited = average_code_length(frequencies, huffman_lengths(frequencies))
+    limited = average_code_length(frequencies, package_merge_lengths(frequencies, max_length))
+    return limited / unlimited - 1 if unlimited else 0.0
+
+def trie_heights(root: HuffmanNode) -> dict[int, int]:
+    '''
+    Finds the height of every node in the given trie (the length of the
+    longest path from it down to a leaf), iteratively to support deep tries.
+    
+    Parameters:
+        root (HuffmanNode):
+            The root of the trie to measure
+    
+    Returns:
+        dict[int, int]:
+            Maps the id() of each node in the trie to its height; leaves
+            have height 0
+    '''
+    heights: dict[int, int] = {}
+    stack: list[tuple[HuffmanNode, bool]] = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        children = [child for child in (node.zero_child, node.one_child) if child is not None]
+        if expanded or not children:
+            heights[id(node)] = 1 + max((heights[id(child)] for child in children), default=-1)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+    return heights
+
+def canonical_codes(code_lengths: Mapping[str, int]) -> dict[str, str]:
+    '''
+    Assigns the canonical prefix code for the given code lengths: chars are
+    ordered by (length, char), and each is given the next code, in counting
+    order, of its length. A model is thus fully described by its lengths.
+    
+    Parameters:
+        code_lengths (Mapping[str, int]):
+            Maps each char to the length of its code, in bits
+    
+    Returns:
+        dict[str, str]:
+            Maps each char to its canonical code as a bitstring
+    
+    Example:
+        canonical_codes({ETB_CHAR: 3, "A": 3, "B": 1, "C": 2})
+        => {"B": "0", "C": "10", ETB_CHAR: "110", "A": "111"}
+    '''
+    encoding_map: dict[str, str] = {}
+    code, previous_length = 0, 0
+    # Sorting (length, char) pairs compares in C, and is nearly free for
+    # lengths already in this order (as save_model writes them); the codes
+    # of each length are then consecutive, and are formatted in bulk
+    for length, group in itertools.groupby(sorted(zip(code_lengths.values(), code_lengths)), itemgetter(0)):
+        chars = list(map(itemgetter(1), group))
+        code <<= length - previous_length
+        if length < 1 or (code + len(chars) - 1) >> length:
+            raise ValueError("Code lengths do not describe a prefix code")
+        # A leading 1 bit keeps each code's leading 0s, and is sliced off
+        first = (1 << length) + code
+        encoding_map.update(zip(chars, map(itemgetter(slice(3, None)), map(bin, range(first, first + len(chars))))))
+        code, previous_length = code + len(chars), length
+    return encoding_map
+
+def trie_from_codes(encoding_map: Mapping[str, str]) -> HuffmanNode:
+    '''
+    Rebuilds a trie whose root-to-leaf paths are the given codes, e.g., to
+    decode with canonical codes. Internal nodes have an empty char and a
+    frequency of 0, since only the shape of the trie is known.
+    
+    Parameters:
+        encoding_map (Mapping[str, str]):
+            Maps each char to its code as a bitstring, forming a prefix code
+    
+    Returns:
+        HuffmanNode:
+            The root of the rebuilt trie
+    '''
+    root = HuffmanNode("", 0)
+    for char, code in encoding_map.items():
+        node = root
+        for bit in code:
+            if node.char:
+                raise ValueError("Codes do not form a prefix code")
+            if bit == "0":
+                node.zero_child = node = node.zero_child or HuffmanNode("", 0)
+            else:
+                node.one_child = node = node.one_child or HuffmanNode("", 0)
+        if not node.is_leaf() or node.char:
+            raise ValueError("Codes do not form a prefix code")
+        node.char = char
+    return root
+
+class DecodeTable:
+    '''
+    One level of a multi-level lookup table for decoding Huffman codes several
+    bits at a time, built from a (sub)trie by build_decode_table.
+    '''
+    
+    __slots__ = ("bits", "mask", "entries")
+    
+    def __init__(self, bits: int):
+        '''
+        Creates an empty table indexed by the next `bits` bits of input. Each
+        entry of the table is one of:
+        - (char, length, None): the next `length` (<= bits) bits of input are
+          the code of char, completing a symbol
+        - ("", bits, subtable): all `bits` bits are consumed without reaching
+          a leaf, and decoding continues with the DecodeTable subtable
+        - None: no code of the trie starts with these bits
+        
+        Parameters:
+            bits (int):
+                The number of bits of input that index this table
+        '''
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.entries: list[Optional[tuple[str, int, Optional[DecodeTable]]]] = [None] * (1 << bits)
+
+def build_decode_table(root: HuffmanNode, bits: int) -> DecodeTable:
+    '''
+    Builds the lookup tables for decoding the codes of the given trie up to
+    `bits` bits at a time. Codes longer than that continue in second-level
+    (and deeper) tables, each sized to the height of its subtrie so that long
+    but rare codes do not blow up the size of the tables.
+    
+    Parameters:
+        root (HuffmanNode):
+            The root of the Huffman Trie to decode with
+        bits (int):
+            The maximum number of bits resolved by a single table lookup
+    
+    Returns:
+        DecodeTable:
+            The first-level table, indexed by the first bits of a code
+    '''
+    heights = trie_heights(root)
+    top_table = DecodeTable(min(bits, heights[id(root)]))
+    work: list[tuple[DecodeTable, HuffmanNode]] = [(top_table, root)]
+    while work:
+        table, subtrie = work.pop()
+        stack: list[tuple[HuffmanNode, int, int]] = [(subtrie, 0, 0)]
+        while stack:
+            node, code, depth = stack.pop()
+            if node.is_leaf():
+                # Every index that starts with this code decodes to the leaf
+                shift = table.bits - depth
+                table.entries[code << shift:(code + 1) << shift] = [(node.char, depth, None)] * (1 << shift)
+            elif depth == table.bits:
+                subtable = DecodeTable(min(bits, heights[id(node)]))
+                table.entries[code] = ("", depth, subtable)
+                work.append((subtable, node))
+            else:
+                if node.zero_child is not None:
+                    stack.append((node.zero_child, code << 1, depth + 1))
+                if node.one_child is not None:
+                    stack.append((node.one_child, code << 1 | 1, depth + 1))
+    return top_table
+
+class CodeTranslation(dict[int, Optional[str]]):
+    '''
+    Table for str.translate that maps the code point of each char to its
+    code as a bitstring, and deletes chars that have no code.
+    
+    Example:
+        "ABZ".translate(CodeTranslation({ord("A"): "101", ord("B"): "0"}))
+        => "1010"
+    '''
+    
+    def __missing__(self, code_point: int) -> None:
+        '''
+        Parameters:
+            code_point (int):
+                The code point of a char without a code
+        
+        Returns:
+            None:
+                Which makes str.translate delete the char
+        '''
+        return None
+
+def decode_bits(table: DecodeTable, data: bytes, out: list[str],
+                acc: int = 0, acc_bits: int = 0) -> tuple[int, int, bool]:
+    '''
+    Decodes the chars whose codes are in the given data, appending them to
+    out, until either the ETB_CHAR is decoded or the data runs out. Bits of
+    an incomplete code at the end of the data are returned so that decoding
+    can be resumed once more data arrives.
+    
+    Parameters:
+        table (DecodeTable):
+            The first-level decoding table (see: build_decode_table)
+        data (bytes):
+            The compressed bytes to decode
+        out (list[str]):
+            The list that decoded chars are appended to
+        acc, acc_bits (int):
+            Pending bits (most significant first) left over from previous
+            data, and their count
+    
+    Returns:
+        tuple[int, int, bool]:
+            The unconsumed (acc, acc_bits), and whether decoding has stopped
+            for good because the ETB_CHAR (or an invalid code) was reached
+    '''
+    position, end = 0, len(data)
+    top_entries, top_bits, top_mask = table.entries, table.bits, table.mask
+    append = out.append
+    while True:
+        # Fast path: enough bits are buffered and the first lookup is a leaf
+        if acc_bits >= top_bits:
+            entry = top_entries[acc >> (acc_bits - top_bits) & top_mask]
+            if entry is not None and entry[2] is None:
+                char = entry[0]
+                acc_bits -= entry[1]
+                if char == ETB_CHAR:
+                    return acc & ((1 << acc_bits) - 1), acc_bits, True
+                append(char)
+                continue
+        
+        node_table, available = table, acc_bits
+        while True:
+            bits = node_table.bits
+            # Short of bits, peek at them padded with 0s; a code no longer
+            # than the available bits is still decoded correctly
+            if available >= bits:
+                entry = node_table.entries[acc >> (available - bits) & node_table.mask]
+            else:
+                entry = node_table.entries[acc << (bits - available) & node_table.mask]
+            if entry is None:
+                return acc & ((1 << acc_bits) - 1), acc_bits, True
+            char, length, subtable = entry
+            if length > available:
+                char = ""
+                break
+            available -= length
+            if subtable is None:
+                break
+            node_table = subtable
+        
+        if char:
+            acc_bits = available
+            if char == ETB_CHAR:
+                return acc & ((1 << acc_bits) - 1), acc_bits, True
+            append(char)
+        elif position < end:
+            chunk = data[position:position + 32]
+            position += 32
+            acc = (acc & ((1 << acc_bits) - 1)) << (len(chunk) << 3) | int.from_bytes(chunk, "big")
+            acc_bits += len(chunk) << 3
+        else:
+            return acc & ((1 << acc_bits) - 1), acc_bits, False
+
 class ReusableHuffman:
     '''
     ReusableHuffman encoder / decoder that is trained on some original
@@ -64,7 +602,8 @@ class ReusableHuffman:
     text messages that have similar distributions of characters.
     '''
     
-    def __init__(self, corpus: str):
+    def __init__(self, corpus: str, construction: str = "heap", decode_table_bits: int = 10,
+                 canonical: bool = False, max_code_length: Optional[int] = None):
         '''
         Constructor for a new ReusableHuffman encoder / decoder that is fit to
         the given text corpus and can then be used to compress and decompress
@@ -74,28 +613,226 @@ class ReusableHuffman:
             corpus (str):
                 The text corpus on which to fit the ReusableHuffman instance,
                 which will be used to construct the encoding map
+            construction (str):
+                How to build the Huffman Trie: "heap" (see build_trie_heap) or
+                "two_queue" (see build_trie_two_queue); both yield the same trie
+            decode_table_bits (int):
+                The number of bits resolved per lookup when decompressing
+                (see: build_decode_table); 8 to 12 is typically best
+            canonical (bool):
+                Whether to only take the code lengths from the trie and assign
+                the codes themselves canonically (see: canonical_codes), so that
+                the model can be described by get_code_lengths alone
+            max_code_length (Optional[int]):
+                If given, the longest code allowed, in bits; the code lengths
+                then come from package_merge_lengths instead of the trie, and
+                codes are always assigned canonically
         '''
-        self._encoding_map: dict[str, str] = dict()
-
-        chars = set(corpus)
-        self.leaves: PriorityQueue[HuffmanNode] = PriorityQueue()
-        
-        etb_node = HuffmanNode(ETB_CHAR, 1)
-        self.leaves.put(etb_node)
-        
-        if len(corpus) > 0:
-            # Create initial nodes
-            for item in chars:
-                letter_count = corpus.count(item)
-                node = HuffmanNode(item, letter_count)
-                self.leaves.put(node)
-                
+        frequencies = counts_to_frequencies(count_frequencies(corpus))
+        self._train(frequencies, construction, decode_table_bits, canonical, max_code_length)
+    
+    @classmethod
+    def from_frequencies(cls, frequencies: Mapping[str, int], construction: str = "heap",
+                         decode_table_bits: int = 10, canonical: bool = False,
+                         max_code_length: Optional[int] = None) -> "ReusableHuffman":
+        '''
+        Alternate constructor that builds the trie straight from a table of
+        char frequencies (e.g., counts aggregated across machines), so that
+        no corpus needs to be rebuilt or scanned.
+        
+        Parameters:
+            frequencies (Mapping[str, int]):
+                Maps each char (a string of length 1) to its (nonnegative)
+                frequency in the training data; the ETB_CHAR is given a
+                frequency of 1 if absent, just as when training on a corpus
+            construction, decode_table_bits, canonical, max_code_length:
+                As in the constructor
+        
+        Returns:
+            ReusableHuffman:
+                An instance equal to one trained on any corpus with the given
+                char frequencies
+        
+        Example:
+            ReusableHuffman.from_frequencies({"A": 1, "B": 3, "C": 2})
+            # Same encoding map as ReusableHuffman("ABBBCC")
+        '''
+        if any(freq < 0 for freq in frequencies.values()):
+            raise ValueError("Frequencies must be nonnegative")
+        if any(len(char) != 1 for char in frequencies):
+            raise ValueError("Frequencies must be keyed by single chars")
+        huff_coder = cls.__new__(cls)
+        huff_coder._train({ETB_CHAR: 1, **frequencies}, construction, decode_table_bits,
+                          canonical, max_code_length)
+        return huff_coder
+    
+    def _train(self, frequencies: dict[str, int], construction: str, decode_table_bits: int,
+               canonical: bool, max_code_length: Optional[int]) -> None:
+        '''
+        Builds the trie and codes for the given char frequencies, with the
+        options described in the constructor.
+        
+        Parameters:
+            frequencies (dict[str, int]):
+                Maps each char, including the ETB_CHAR, to its frequency
+            construction, decode_table_bits, canonical, max_code_length:
+                As in the constructor
+        '''
+        if construction not in ("heap", "two_queue"):
+            raise ValueError("Unknown trie construction: " + repr(construction))
+        encoding_map: dict[str, str]
+        
+        if max_code_length is not None:
+            # Length-limited codes are always canonical
+            encoding_map = canonical_codes(package_merge_lengths(frequencies, max_code_length))
+        
+        elif len(frequencies) > 1:
             # Create trie using leaves and find root
-            self._trie_root = self.grow_trie(self.leaves)
-            self._encoding_map = self.create_encoding_map(self._trie_root, "")
+            trie_root = build_trie(frequencies, construction)
+            encoding_map = self.create_encoding_map(trie_root, "")
             
         else:
-            self._encoding_map = {ETB_CHAR: '0'}
+            encoding_map = {ETB_CHAR: '0'}
+        
+        if canonical and max_code_length is None:
+            encoding_map = canonical_codes({char: len(code) for char, code in encoding_map.items()})
+        # The trie is not kept: decompression rebuilds it from the encoding
+        # map when first needed, so instances that only compress never hold it
+        self._set_codes(encoding_map, decode_table_bits)
+        # Kept so that the model can be updated with more text (see: update)
+        self._frequencies: Optional[dict[str, int]] = dict(frequencies)
+        self._training_options = (construction, canonical, max_code_length)
+    
+    @classmethod
+    def from_code_lengths(cls, code_lengths: Iterable[tuple[str, int]],
+                          decode_table_bits: int = 10) -> "ReusableHuffman":
+        '''
+        Alternate constructor that restores a canonical-code instance from
+        only its (char, code length) pairs, without retraining on a corpus.
+        
+        Parameters:
+            code_lengths (Iterable[tuple[str, int]]):
+                The (char, length) pairs, e.g., from get_code_lengths; must
+                include the ETB_CHAR
+            decode_table_bits (int):
+                As in the constructor
+        
+        Returns:
+            ReusableHuffman:
+                An instance with the canonical codes of the given lengths
+        
+        Example:
+            huff_coder = ReusableHuffman("ABBBCC", canonical=True)
+            ReusableHuffman.from_code_lengths(huff_coder.get_code_lengths())
+            # Encodes and decodes exactly as huff_coder does
+        '''
+        encoding_map = canonical_codes(dict(code_lengths))
+        if ETB_CHAR not in encoding_map:
+            raise ValueError("Code lengths must include the ETB_CHAR")
+        huff_coder = cls.__new__(cls)
+        huff_coder._set_codes(encoding_map, decode_table_bits)
+        return huff_coder
+    
+    @classmethod
+    def load_model(cls, path: str, decode_table_bits: int = 10) -> "ReusableHuffman":
+        '''
+        Alternate constructor that restores an instance from a binary model
+        file written by save_model. Only the encoding map is parsed from the
+        file; the encoding tables are built from it on the first compression,
+        and the trie and decoding tables on the first decompression.
+        
+        Parameters:
+            path (str):
+                The path of the model file
+            decode_table_bits (int):
+                As in the constructor
+        
+        Returns:
+            ReusableHuffman:
+                An instance with the same encoding map as the saved one
+        '''
+        with open(path, "rb") as model_file:
+            model = model_file.read()
+        if len(model) < MODEL_HEADER.size:
+            raise ValueError("Not a ReusableHuffman model: " + path)
+        magic, version, flags, _, count = MODEL_HEADER.unpack_from(model)
+        if magic != MODEL_MAGIC:
+            raise ValueError("Not a ReusableHuffman model: " + path)
+        if version > MODEL_VERSION:
+            raise ValueError("Unsupported model version: %d" % version)
+        chars_at = MODEL_HEADER.size
+        lengths_at = chars_at + 4 * count
+        codes_at = lengths_at + 2 * count
+        if len(model) < codes_at:
+            raise ValueError("Not a ReusableHuffman model: " + path)
+        # The code points are exactly the chars' UTF-32 encoding
+        chars = model[chars_at:lengths_at].decode("utf-32-le", "surrogatepass")
+        lengths = struct.unpack_from("<%dH" % count, model, lengths_at)
+        if flags & MODEL_CANONICAL:
+            encoding_map = canonical_codes(dict(zip(chars, lengths)))
+        else:
+            codes_end = codes_at + (sum(lengths) + 7) // 8
+            if len(model) < codes_end:
+                raise ValueError("Not a ReusableHuffman model: " + path)
+            bits = bytes_to_bitstring(model[codes_at:codes_end])
+            encoding_map = {}
+            position = 0
+            for char, length in zip(chars, lengths):
+                encoding_map[char] = bits[position:position + length]
+                position += length
+        
+        huff_coder = cls.__new__(cls)
+        huff_coder._set_codes(encoding_map, decode_table_bits)
+        return huff_coder
+    
+    def save_model(self, path: str) -> None:
+        '''
+        Writes this instance's model to a compact, versioned binary file that
+        load_model can restore. After the MODEL_HEADER come the code point of
+        every char (4 bytes each), then the length of each char's code (2 bytes
+        each), all little-endian, and then, unless the codes are canonical (in
+        which case they follow from the lengths), the bits of every code in
+        the same order, padded with 0 bits to a whole byte.
+        
+        Parameters:
+            path (str):
+                The path of the model file to (over)write
+        '''
+        # In canonical order, which makes canonical models quicker to load
+        chars = [char for char, _ in self.get_code_lengths()]
+        codes = [self._encoding_map[char] for char in chars]
+        lengths = [len(code) for code in codes]
+        canonical = canonical_codes(dict(zip(chars, lengths))) == self._encoding_map
+        with open(path, "wb") as model_file:
+            model_file.write(MODEL_HEADER.pack(MODEL_MAGIC, MODEL_VERSION,
+                                               MODEL_CANONICAL if canonical else 0, 0, len(chars)))
+            model_file.write(struct.pack("<%dI" % len(chars), *map(ord, chars)))
+            model_file.write(struct.pack("<%dH" % len(chars), *lengths))
+            if not canonical:
+                model_file.write(bitstring_to_bytes("".join(codes)))
+    
+    def _set_codes(self, encoding_map: dict[str, str], decode_table_bits: int) -> None:
+        '''
+        Installs the given encoding map and the tables derived from it that
+        compression and decompression use.
+        
+        Parameters:
+            encoding_map (dict[str, str]):
+                Maps each char to its code as a bitstring
+            decode_table_bits (int):
+                As in the constructor
+        '''
+        if decode_table_bits < 1:
+            raise ValueError("decode_table_bits must be positive")
+        self._frequencies = None
+        self._pending_updates = 0
+        # Read-only so that compression can use it without defensive copies
+        self._encoding_map: Mapping[str, str] = MappingProxyType(encoding_map)
+        # Built from the encoding map on first compression (see: _get_translation)
+        self._translation: Optional[CodeTranslation] = None
+        # Built from the trie on first use (see: get_decode_table)
+        self._decode_table_bits = decode_table_bits
+        self._decode_table: Optional[DecodeTable] = None
         
         
     def grow_trie(self, trie: PriorityQueue) -> Any:
@@ -120,17 +857,37 @@ class ReusableHuffman:
         return trie.get()
         
     def create_encoding_map(self, node: Optional[HuffmanNode], byte: str) -> Dict[str, str]:
-        # >> [WN] Provide proper docstrings for ALL methods, including helpers you write
-
-        # Uses recursion to form encoding map
-        encoding_map = {}
-        if node is not None:
+        '''
+        Creates the encoding map for the subtrie rooted at the given node by
+        walking it with an explicit stack (so that arbitrarily deep tries do
+        not exhaust the recursion limit), filling a single output dictionary.
+        Codes are carried down as integers and only formatted as bitstrings
+        once a leaf is reached.
+        
+        Parameters:
+            node (Optional[HuffmanNode]):
+                The root of the subtrie to map, or None for an empty map
+            byte (str):
+                The bitstring prefix leading to the given node
+        
+        Returns:
+            Dict[str, str]:
+                Maps each leaf's char to the bitstring of its path from node,
+                prefixed by byte
+        '''
+        encoding_map: Dict[str, str] = {}
+        stack: list[tuple[HuffmanNode, int, int]] = [] if node is None else [(node, 0, 0)]
+        while stack:
+            node, code, depth = stack.pop()
             if node.is_leaf():
-                encoding_map[node.char] = byte
-            else:
-                encoding_map.update(self.create_encoding_map(node.zero_child, byte + "0"))
-                encoding_map.update(self.create_encoding_map(node.one_child, byte + "1"))
-        return encoding_map                
+                encoding_map[node.char] = byte + format(code, "0%db" % depth) if depth else byte
+                continue
+            # Push the one_child first so that zero paths are mapped first
+            if node.one_child is not None:
+                stack.append((node.one_child, code << 1 | 1, depth + 1))
+            if node.zero_child is not None:
+                stack.append((node.zero_child, code << 1, depth + 1))
+        return encoding_map
     
     def get_encoding_map(self) -> dict[str, str]:
         '''
@@ -146,7 +903,148 @@ class ReusableHuffman:
             dict[str, str]:
                 A copy of this ReusableHuffman instance's encoding map
         '''
-        return copy.deepcopy(self._encoding_map)
+        # Values are immutable strs, so a shallow copy is as safe as a deep one
+        return dict(self._encoding_map)
+    
+    # Updates
+    # ---------------------------------------------------------------------------
+    
+    def update(self, more_text: str, rebuild_every: int = 1,
+               max_drift: Optional[float] = None) -> bool:
+        '''
+        Folds more training text into this instance's running char counts, at
+        a cost proportional to the new text, and regenerates the codes from
+        those counts (without retraining on the full corpus) when the given
+        policy calls for it. Until then, the current codes stay in use.
+        
+        Parameters:
+            more_text (str):
+                The new training text
+            rebuild_every (int):
+                Regenerate the codes once this many updates have accumulated
+                since they were last generated (0 to only rebuild on drift)
+            max_drift (Optional[float]):
+                If given, also regenerate the codes as soon as drift() exceeds
+                this fraction
+        
+        Returns:
+            bool:
+                Whether the codes were regenerated
+        
+        Example:
+            huff_coder = ReusableHuffman("ABBB")
+            huff_coder.update("CC")
+            # Same encoding map as ReusableHuffman("ABBBCC")
+        '''
+        if self._frequencies is None:
+            raise ValueError("Only models trained on frequencies can be updated")
+        frequencies = self._frequencies
+        for char, freq in count_frequencies(more_text).items():
+            frequencies[char] = frequencies.get(char, 0) + freq
+        # As in counts_to_frequencies, but in place, so as not to copy the
+        # whole table on every update
+        frequencies[ETB_CHAR] = 1
+        self._pending_updates += 1
+        
+        if (rebuild_every and self._pending_updates >= rebuild_every or
+                max_drift is not None and self.drift() > max_drift):
+            self.refresh()
+            return True
+        return False
+    
+    def drift(self) -> float:
+        '''
+        Measures how far the current codes have fallen behind the running char
+        counts (see: update) as the compression ratio they lose compared with
+        codes regenerated from those counts.
+        
+        Returns:
+            float:
+                The fractional growth of compressed sizes, e.g., 0.01 for 1%
+                more bits, or infinity if some counted chars have no code yet
+        '''
+        if self._frequencies is None:
+            return 0.0
+        if any(char not in self._encoding_map for char in self._frequencies):
+            return float("inf")
+        current = {char: len(code) for char, code in self._encoding_map.items()}
+        optimal = average_code_length(self._frequencies, huffman_lengths(self._frequencies))
+        return average_code_length(self._frequencies, current) / optimal - 1 if optimal else 0.0
+    
+    def refresh(self) -> None:
+        '''
+        Regenerates the codes from the running char counts (see: update), with
+        the same options this instance was trained with.
+        '''
+        if self._frequencies is None:
+            raise ValueError("Only models trained on frequencies can be refreshed")
+        construction, canonical, max_code_length = self._training_options
+        self._train(self._frequencies, construction, self._decode_table_bits,
+                    canonical, max_code_length)
+    
+    def __getstate__(self) -> dict[str, Any]:
+        '''
+        Returns:
+            dict[str, Any]:
+                This instance's attributes for pickling, with its read-only
+                encoding map (which cannot be pickled) as a plain dictionary,
+                and without the tables that are rebuilt lazily
+        '''
+        state = self.__dict__.copy()
+        state["_encoding_map"] = dict(self._encoding_map)
+        state["_translation"] = None
+        return state
+    
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        '''
+        Restores the attributes of an unpickled instance (see: __getstate__).
+        
+        Parameters:
+            state (dict[str, Any]):
+                The pickled attributes
+        '''
+        self.__dict__.update(state)
+        self._encoding_map = MappingProxyType(state["_encoding_map"])
+    
+    def get_code_lengths(self) -> list[tuple[str, int]]:
+        '''
+        Getter for the length of each char's code, which fully describes an
+        instance built with canonical=True (see: from_code_lengths).
+        
+        Returns:
+            list[tuple[str, int]]:
+                (char, code length) pairs, ordered by length and then char
+        '''
+        return sorted(((char, len(code)) for char, code in self._encoding_map.items()),
+                      key=lambda item: (item[1], item[0]))
+    
+    def _get_translation(self) -> CodeTranslation:
+        '''
+        Returns:
+            CodeTranslation:
+                The codes as bitstrings keyed by code point, for str.translate,
+                built from the encoding map on first use
+        '''
+        if self._translation is None:
+            self._translation = CodeTranslation(
+                {ord(char): code for char, code in self._encoding_map.items()})
+        return self._translation
+    
+    def get_decode_table(self) -> DecodeTable:
+        '''
+        Getter for the table used to decompress messages, which is built on
+        first use from a Huffman Trie rebuilt from the encoding map, so that
+        instances that only compress never pay for either. The trie is not
+        kept once the table is built.
+        
+        Returns:
+            DecodeTable:
+                The first-level decoding table of this instance's trie
+        '''
+        if self._decode_table is None:
+            self._decode_table = build_decode_table(trie_from_codes(self._encoding_map),
+                                                    self._decode_table_bits)
+        return self._decode_table
     
     # Compression
     # ---------------------------------------------------------------------------
@@ -156,7 +1054,10 @@ class ReusableHuffman:
         Compresses the given String message / text corpus into its Huffman-coded
         bitstring, and then converted into a Python bytes type.
         
-        [!] Uses the _encoding_map attribute generated during construction.
+        [!] Uses the _translation table, built on first compression, to
+        expand the message into its bitstring with str.translate, in chunks,
+        each of which is converted to bytes with a single int(bits, 2).
+        Characters that are not in the encoding map are skipped.
         
         Parameters:
             message (str):
@@ -178,32 +1079,87 @@ class ReusableHuffman:
             solution = bitstrings_to_bytes(['10100011', '11100000'])
             self.assertEqual(solution, compressed_message)
         '''
-        encode_map: dict[str, str] = self.get_encoding_map()
-        
-        # Manually add ETB for compression
-        message += ETB_CHAR
-        bitstr: str = ''
-        final_bitstr: list[str] = []
-        for char in message:
-            if char in encode_map:
-                # Add bits to bitstring until leaf is found
-                for num in encode_map[char]:
-                    # When bitstring is greater than 8 bytes, add to final bitstring and reset
-                    if len(bitstr) == 8:
-                        final_bitstr.append(bitstr)
-                        bitstr = ''
-                    bitstr += num
-        # Manually add padding
-        if len(bitstr) < 8:
-            while len(bitstr) != 8:
-                bitstr += '0'
-            final_bitstr.append(bitstr)
-
-        # >> [WN] Bit uneccessary to have a variable compressed_msg. You can combine the
-        # following two lines together and they will make your code more simplified.        
-        compressed_msg = bitstrings_to_bytes(final_bitstr)
-        return compressed_msg
+        compressed_msg = bytearray()
+        acc, acc_bits = self._pack(message, compressed_msg)
+        # Manually add ETB (without copying the message) and padding
+        acc, acc_bits = self._pack(ETB_CHAR, compressed_msg, acc, acc_bits)
+        pad_bits(compressed_msg, acc, acc_bits)
+        return bytes(compressed_msg)
 
+    def _pack(self, text: str, out: bytearray, acc: int = 0, acc_bits: int = 0) -> tuple[int, int]:
+        '''
+        Packs the codes of the given text into a bit accumulator, as
+        byte_utils.pack_codes does one char at a time, but expands each chunk
+        of the text into a bitstring with a single str.translate and converts
+        that to bytes all at once.
+        
+        Parameters:
+            text (str):
+                The chars whose codes are packed
+            out (bytearray):
+                The buffer that completed bytes are appended to
+            acc, acc_bits (int):
+                The pending bits and their count
+        
+        Returns:
+            tuple[int, int]:
+                The new (acc, acc_bits) after packing the text
+        '''
+        translation = self._get_translation()
+        for start in range(0, len(text), TRANSLATE_CHUNK_SIZE):
+            bits = text[start:start + TRANSLATE_CHUNK_SIZE].translate(translation)
+            if not bits:
+                continue
+            acc = acc << len(bits) | int(bits, 2)
+            acc_bits += len(bits)
+            leftover = acc_bits & 7
+            out += (acc >> leftover).to_bytes(acc_bits >> 3, "big")
+            acc &= (1 << leftover) - 1
+            acc_bits = leftover
+        return acc, acc_bits
+    
+    def compress_stream(self, source: Union[Iterable[str], TextIO],
+                        chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        '''
+        Compresses a message that arrives in pieces, yielding its compressed
+        bytes incrementally. Bits of codes that straddle chunk boundaries are
+        carried over to the next chunk, so the concatenation of everything
+        yielded is exactly compress_message of the concatenated chunks, while
+        memory use stays bounded by the size of a single chunk.
+        
+        Parameters:
+            source (Union[Iterable[str], TextIO]):
+                Either an iterable of str chunks of the message, or a text
+                file object from which the message is read
+            chunk_size (int):
+                How many characters to read at a time from a file object
+        
+        Returns:
+            Iterator[bytes]:
+                The compressed message in consecutive pieces, the last of which
+                is terminated by the ETB_CHAR and padding
+        
+        Example:
+            huff_coder = ReusableHuffman("ABBBCC")
+            b"".join(huff_coder.compress_stream(["ABB", "BCC"]))
+            => huff_coder.compress_message("ABBBCC")
+        '''
+        chunks: Iterable[str] = source
+        if isinstance(source, io.TextIOBase):
+            read = source.read
+            chunks = iter(lambda: read(chunk_size), "")
+        
+        compressed_chunk = bytearray()
+        acc, acc_bits = 0, 0
+        for chunk in chunks:
+            acc, acc_bits = self._pack(chunk, compressed_chunk, acc, acc_bits)
+            if compressed_chunk:
+                yield bytes(compressed_chunk)
+                compressed_chunk.clear()
+        acc, acc_bits = self._pack(ETB_CHAR, compressed_chunk, acc, acc_bits)
+        pad_bits(compressed_chunk, acc, acc_bits)
+        yield bytes(compressed_chunk)
+    
     # Decompression
     # ---------------------------------------------------------------------------
     
@@ -212,7 +1168,8 @@ class ReusableHuffman:
         Decompresses the given bytes representing a compressed corpus into their
         original character format.
         
-        [!] Should use the Huffman Trie generated during construction.
+        [!] Uses lookup tables built from the Huffman Trie generated during
+        construction, resolving several bits per step (see: decode_bits).
         
         Parameters:
             compressed_msg (bytes):
@@ -232,30 +1189,82 @@ class ReusableHuffman:
             compressed_msg: bytes = bitstrings_to_bytes(['10100011', '11100000'])
             self.assertEqual("ABBBCC", huff_coder.decompress(compressed_msg))
         '''
-        encoded_msg: str = ''
-        decoded_msg: str = ''
-
-        for byte in compressed_msg:
-            encoded_msg += byte_to_bitstring(byte)
-        
-        trie_root: "HuffmanNode" = self._trie_root
-        node = trie_root
-        
-        # Traverse trie using 0 and 1 paths until leaf is found
-        for bit in encoded_msg: 
-            if bit == '0' and node.zero_child is not None:
-                node = node.zero_child
-            elif bit == '1' and node.one_child is not None:
-                node = node.one_child
+        decoded_msg: list[str] = []
+        decode_bits(self.get_decode_table(), compressed_msg, decoded_msg)
+        return "".join(decoded_msg)
+    
+    def decoder(self) -> "StreamDecoder":
+        '''
+        Creates an incremental decoder for messages compressed by this instance
+        that arrive in pieces, e.g., from a socket or pipe.
+        
+        Returns:
+            StreamDecoder:
+                A new decoder, positioned at the start of a message
+        '''
+        return StreamDecoder(self)
 
-            if node.is_leaf():
-                # Return message once ETB is found
-                if node.char == ETB_CHAR:
-                    return decoded_msg
-                decoded_msg += node.char
-                node = self._trie_root
+class StreamDecoder:
+    '''
+    Incremental decoder that decompresses a message fed to it in arbitrary
+    pieces, using constant memory beyond its output.
+    '''
+    
+    def __init__(self, huff_coder: ReusableHuffman):
+        '''
+        Creates a decoder positioned at the start of a message compressed by
+        the given ReusableHuffman instance. Between calls to feed, it keeps
+        only the bits of the code it is partway through (its position in the
+        trie), never the input as a whole.
+        
+        Parameters:
+            huff_coder (ReusableHuffman):
+                The instance whose encoding compressed the message
+        '''
+        self._table = huff_coder.get_decode_table()
+        self._acc = 0
+        self._acc_bits = 0
+        self.done = False
+    
+    def feed(self, data: bytes) -> str:
+        '''
+        Decodes the next piece of the compressed message.
+        
+        Parameters:
+            data (bytes):
+                The bytes following those given to previous calls; ignored once
+                the message is done
+        
+        Returns:
+            str:
+                The chars completed by this piece, stopping before the ETB_CHAR
+                if it is reached (after which done is True)
+        
+        Example:
+            decoder = ReusableHuffman("ABBBCC").decoder()
+            decoder.feed(bitstrings_to_bytes(['10100011'])) => "ABBBC"
+            decoder.feed(bitstrings_to_bytes(['11100000'])) => "C"
+            decoder.done => True
+        '''
+        if self.done:
+            return ""
+        decoded: list[str] = []
+        self._acc, self._acc_bits, self.done = decode_bits(self._table, data, decoded,
+                                                           self._acc, self._acc_bits)
+        return "".join(decoded)
     
-        return decoded_msg
+    def flush(self) -> str:
+        '''
+        Signals the end of the input, discarding the bits of any incomplete
+        code, and resets the decoder so it can decode another message.
+        
+        Returns:
+            str:
+                Any chars left to decode, which is always "" since feed decodes
+                eagerly; returned so that callers can treat every piece alike
+        '''
+        self._acc, self._acc_bits, self.done = 0, 0, False
+        return ""
     
 # ===================================================
 # >>> [WN] Summary
@@ -0,0 +1,449 @@
+'''
+Training entry points for ReusableHuffman models whose corpora are too large
+to hold in memory as a single str: counting is spread across processes, done
+incrementally over memory-mapped files, or estimated from a sample. Streams
+whose distribution drifts can be followed with a StreamTrainer.
+'''
+
+import codecs
+import math
+import mmap
+import os
+import random
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import *
+from typing import *
+from compression_utils import *
+
+def utf8_boundary(path: str, offset: int) -> int:
+    '''
+    Finds the first position at or after the given byte offset of a UTF-8
+    file at which a character starts, so that the file can be split into
+    ranges without cutting any character in two.
+    
+    Parameters:
+        path (str):
+            The path of the UTF-8 encoded file
+        offset (int):
+            The byte offset to start looking from
+    
+    Returns:
+        int:
+            The offset of the first byte at or after offset that is not a
+            UTF-8 continuation byte, or the file's size if there is none
+    '''
+    with open(path, "rb") as corpus_file:
+        corpus_file.seek(offset)
+        # A character is at most 4 bytes, so one starts within 3 bytes
+        for i, byte in enumerate(corpus_file.read(4)):
+            if byte & 0xC0 != 0x80:
+                return offset + i
+    return min(offset + 4, os.path.getsize(path))
+
+def count_file_range(path: str, start: int = 0, end: Optional[int] = None,
+                     window_size: int = 1 << 22, encoding: str = "utf-8") -> dict[str, int]:
+    '''
+    Counts the characters of a text file between two byte offsets. The file is
+    memory-mapped and decoded one window of window_size bytes at a time (with
+    characters that straddle windows carried over by an incremental decoder),
+    so that memory use stays flat no matter how large the file is.
+    
+    Parameters:
+        path (str):
+            The path of the text file
+        start, end (int, Optional[int]):
+            The byte range to count, which must start and end on character
+            boundaries; end defaults to the end of the file
+        window_size (int):
+            How many bytes to decode and count at a time
+        encoding (str):
+            The encoding of the file
+    
+    Returns:
+        dict[str, int]:
+            Maps each character in the range to its number of occurrences
+    '''
+    counts: Counter[str] = Counter()
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(path, "rb") as corpus_file:
+        end = os.path.getsize(path) if end is None else end
+        if end > start:
+            with mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ) as corpus:
+                for position in range(start, end, window_size):
+                    counts.update(decoder.decode(corpus[position:min(position + window_size, end)]))
+    counts.update(decoder.decode(b"", final=True))
+    return dict(counts)
+
+def train_from_file(path: str, window_size: int = 1 << 22, encoding: str = "utf-8",
+                    **options: Any) -> ReusableHuffman:
+    '''
+    Trains a ReusableHuffman instance on a corpus file of any size, counting
+    its characters through a memory map in bounded windows (see:
+    count_file_range) rather than reading it into a single str. The result is
+    identical to training on the file's contents, read without newline
+    translation.
+    
+    Parameters:
+        path (str):
+            The path of the corpus file
+        window_size (int):
+            How many bytes to decode and count at a time
+        encoding (str):
+            The encoding of the file
+        options (Any):
+            Further keyword arguments for ReusableHuffman.from_frequencies,
+            e.g., construction or canonical
+    
+    Returns:
+        ReusableHuffman:
+            The instance trained on the file's contents
+    '''
+    counts = count_file_range(path, window_size=window_size, encoding=encoding)
+    return ReusableHuffman.from_frequencies(counts_to_frequencies(counts), **options)
+
+def train_parallel(sources: Union[str, Sequence[str]], workers: Optional[int] = None,
+                   **options: Any) -> ReusableHuffman:
+    '''
+    Trains a ReusableHuffman instance on a corpus stored in one or more UTF-8
+    files, counting characters in separate processes and merging their counts.
+    The result is identical to training on the (concatenated) contents of the
+    files as a single str, read without newline translation.
+    
+    Parameters:
+        sources (Union[str, Sequence[str]]):
+            Either the path of a single corpus file, which is split into one
+            byte range per worker, or a list of paths of corpus shards, each of
+            which is counted as a whole
+        workers (Optional[int]):
+            The number of processes to use, by default one per CPU
+        options (Any):
+            Further keyword arguments for ReusableHuffman.from_frequencies,
+            e.g., construction or canonical
+    
+    Returns:
+        ReusableHuffman:
+            The instance trained on the whole corpus
+    
+    Example:
+        huff_coder = train_parallel(["logs-0.txt", "logs-1.txt"], workers=2)
+    '''
+    workers = workers or os.cpu_count() or 1
+    if isinstance(sources, str):
+        size = os.path.getsize(sources)
+        bounds = sorted({0, size} | {utf8_boundary(sources, size * i // workers) for i in range(1, workers)})
+        ranges = [(sources, start, end) for start, end in zip(bounds, bounds[1:])]
+    else:
+        ranges = [(path, 0, os.path.getsize(path)) for path in sources]
+    
+    counts: Counter[str] = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(count_file_range, *file_range) for file_range in ranges]
+        for future in futures:
+            counts.update(future.result())
+    return ReusableHuffman.from_frequencies(counts_to_frequencies(counts), **options)
+
+def sample_chars(source: Union[str, Iterable[str]], sample_size: int, method: str = "random",
+                 seed: Optional[int] = None, distinct: Optional[set[str]] = None) -> tuple[list[str], int]:
+    '''
+    Draws a sample of the characters of a corpus, at a cost that depends on
+    the sample size rather than the corpus size (apart from iterating over
+    the chunks of a stream).
+    
+    Parameters:
+        source (Union[str, Iterable[str]]):
+            Either the corpus, or a stream of its chunks
+        sample_size (int):
+            How many characters to draw; the whole corpus is returned if it
+            is no longer than this
+        method (str):
+            "random" for a uniform sample without replacement (taken from a
+            stream by reservoir sampling, skipping ahead as in Algorithm L), or
+            "stratified" for one random character from each of sample_size
+            equal slices of the corpus (not available for streams)
+        seed (Optional[int]):
+            Seed for the random number generator
+        distinct (Optional[set[str]]):
+            If given, every distinct character of the corpus is added to it,
+            in a single C-level pass (set.update) over the corpus or chunks
+    
+    Returns:
+        tuple[list[str], int]:
+            The sampled characters and the total length of the corpus
+    '''
+    if method not in ("random", "stratified"):
+        raise ValueError("Unknown sampling method: " + repr(method))
+    rng = random.Random(seed)
+    if isinstance(source, str):
+        if distinct is not None:
+            distinct.update(source)
+        total = len(source)
+        if total <= sample_size:
+            return list(source), total
+        if method == "stratified":
+            return [source[int((i + rng.random()) * total / sample_size)] for i in range(sample_size)], total
+        return [source[i] for i in rng.sample(range(total), sample_size)], total
+    if method == "stratified":
+        raise ValueError("Stratified sampling needs the length of the corpus up front")
+    
+    reservoir: list[str] = []
+    # Index of the next character to swap into the reservoir once it is full
+    weight = math.exp(math.log(1.0 - rng.random()) / sample_size)
+    next_index = sample_size + skip_length(rng, weight)
+    total = 0
+    for chunk in source:
+        if distinct is not None:
+            distinct.update(chunk)
+        chunk_start, total = total, total + len(chunk)
+        if len(reservoir) < sample_size:
+            reservoir.extend(chunk[:sample_size - len(reservoir)])
+        while next_index < total:
+            reservoir[rng.randrange(sample_size)] = chunk[next_index - chunk_start]
+            weight *= math.exp(math.log(1.0 - rng.random()) / sample_size)
+            next_index += skip_length(rng, weight) + 1
+    return reservoir, total
+
+def skip_length(rng: random.Random, weight: float) -> int:
+    '''
+    Parameters:
+        rng (random.Random):
+            The random number generator to draw from
+        weight (float):
+            The current weight of Algorithm L, in (0, 1]
+    
+    Returns:
+        int:
+            How many characters reservoir sampling should skip before the
+            next one is swapped into the reservoir
+    '''
+    if weight >= 1.0:
+        return 0
+    return int(math.log(1.0 - rng.random()) / math.log(1.0 - weight))
+
+@dataclass
+class SampledTraining:
+    '''
+    The outcome of train_sampled: a model trained on a sample of a corpus,
+    along with an estimate of what training on the sample costs.
+    '''
+    model: ReusableHuffman
+    sample_size: int
+    corpus_size: int
+    # Estimated fractional growth of compressed sizes compared with a model
+    # trained on the full corpus, e.g., 0.01 for 1% more bits, over the chars
+    # that the sample represents
+    estimated_ratio_loss: float
+    # Estimated share of the corpus made up of chars that are missing from the
+    # sample, which are given codes as if seen once (see: estimate_unseen_mass)
+    unseen_mass: float
+
+def estimate_ratio_loss(sample: Sequence[str]) -> float:
+    '''
+    Estimates how much worse a code trained on a sample compresses than one
+    trained on the full corpus, by 2-fold cross-validation: a code trained on
+    each half of the sample is measured on the other half against that half's
+    own optimal code. Chars that one half lacks are left out of its measure,
+    since their share is estimated separately (see: estimate_unseen_mass).
+    Since each code is trained on only half of the sample, the estimate errs
+    on the side of overstating the loss.
+    
+    Parameters:
+        sample (Sequence[str]):
+            The sampled characters, e.g., from sample_chars
+    
+    Returns:
+        float:
+            The estimated fractional growth of compressed sizes
+    '''
+    halves = [Counter(sample[0::2]), Counter(sample[1::2])]
+    losses: list[float] = []
+    for trained, tested in [halves, halves[::-1]]:
+        if not trained or not tested:
+            continue
+        seen = {char: count for char, count in tested.items() if char in trained}
+        optimal = average_code_length(seen, huffman_lengths(seen))
+        if optimal:
+            losses.append(average_code_length(seen, huffman_lengths(trained)) / optimal - 1)
+    return sum(losses) / len(losses) if losses else 0.0
+
+def estimate_unseen_mass(sample: Sequence[str]) -> float:
+    '''
+    Estimates the share of a corpus made up of chars missing from a random
+    sample of it, as the share of the sample made up of chars it holds only
+    once (the Good-Turing estimate).
+    
+    Parameters:
+        sample (Sequence[str]):
+            The sampled characters, e.g., from sample_chars
+    
+    Returns:
+        float:
+            The estimated share of the corpus, from 0 to 1
+    '''
+    if not sample:
+        return 0.0
+    return sum(1 for count in Counter(sample).values() if count == 1) / len(sample)
+
+def train_sampled(source: Union[str, Iterable[str]], sample_size: int = 100_000,
+                  method: str = "random", seed: Optional[int] = None,
+                  alphabet: Iterable[str] = (), **options: Any) -> SampledTraining:
+    '''
+    Trains a ReusableHuffman instance on char frequencies estimated from a
+    sample of a corpus (see: sample_chars), so that retraining costs a fixed
+    number of samples rather than a pass over the whole corpus (apart from
+    collecting its distinct chars). Every char of the corpus, and of the
+    given alphabet, is guaranteed a code: those missing from the sample are
+    given a frequency of 1.
+    
+    Parameters:
+        source (Union[str, Iterable[str]]):
+            Either the corpus, or a stream of its chunks
+        sample_size (int):
+            How many characters to sample
+        method, seed:
+            As in sample_chars
+        alphabet (Iterable[str]):
+            Chars that must be given a code even if they are not in the corpus
+        options (Any):
+            Further keyword arguments for ReusableHuffman.from_frequencies,
+            e.g., construction or canonical
+    
+    Returns:
+        SampledTraining:
+            The trained model, the sample and corpus sizes, and the estimated
+            loss of compression ratio and share of unsampled chars (see:
+            estimate_ratio_loss, estimate_unseen_mass)
+    '''
+    distinct = set(alphabet)
+    sample, corpus_size = sample_chars(source, sample_size, method, seed, distinct)
+    frequencies = dict.fromkeys(distinct, 1)
+    # Scale counts up to the corpus size
+    scale = corpus_size / len(sample) if sample else 1.0
+    frequencies.update((char, max(1, round(count * scale))) for char, count in Counter(sample).items())
+    # A sample of the whole corpus misses nothing
+    unseen_mass = estimate_unseen_mass(sample) if len(sample) < corpus_size else 0.0
+    return SampledTraining(ReusableHuffman.from_frequencies(counts_to_frequencies(frequencies), **options),
+                           len(sample), corpus_size, estimate_ratio_loss(sample), unseen_mass)
+
+@dataclass
+class ModelSnapshot:
+    '''
+    A model emitted by a StreamTrainer, tagged with a version id that
+    increases with every snapshot the trainer takes.
+    '''
+    version: int
+    model: ReusableHuffman
+
+class StreamTrainer:
+    '''
+    Trainer that follows the char distribution of a live stream as it drifts,
+    counting only recent text: either with exponentially decayed counts, or
+    over a sliding window of the latest chunks. Only counts are kept, never
+    the text itself, and fresh model snapshots are emitted periodically.
+    '''
+    
+    def __init__(self, mode: str = "decay", decay: float = 0.9, window: int = 16,
+                 snapshot_every: int = 1, min_weight: float = 0.5, **options: Any):
+        '''
+        Creates a trainer that has not yet observed any text.
+        
+        Parameters:
+            mode (str):
+                "decay" to scale all counts by decay before each chunk's counts
+                are added, or "window" to count only the latest window chunks
+            decay (float):
+                In "decay" mode, the weight, in (0, 1], that counts keep from
+                one chunk to the next
+            window (int):
+                In "window" mode, the number of latest chunks that are counted
+            snapshot_every (int):
+                How many chunks to observe between snapshots (see: observe)
+            min_weight (float):
+                In "decay" mode, chars whose decayed count falls below this are
+                forgotten (and no longer given a code)
+            options (Any):
+                Further keyword arguments for ReusableHuffman.from_frequencies,
+                e.g., construction or canonical
+        '''
+        if mode not in ("decay", "window"):
+            raise ValueError("Unknown training mode: " + repr(mode))
+        if not 0 < decay <= 1 or window < 1 or snapshot_every < 1:
+            raise ValueError("Invalid decay, window or snapshot_every")
+        self._mode = mode
+        self._decay = decay
+        self._min_weight = min_weight
+        self._snapshot_every = snapshot_every
+        self._options = options
+        # Decayed counts are stored multiplied by _scale, which grows instead
+        # of every count shrinking each chunk
+        self._weights: dict[str, float] = {}
+        self._scale = 1.0
+        # Per-chunk counts within the window, and their running totals
+        self._window: deque[Counter[str]] = deque(maxlen=window)
+        self._totals: Counter[str] = Counter()
+        self._chunks_seen = 0
+        self._version = 0
+    
+    def observe(self, chunk: str) -> Optional[ModelSnapshot]:
+        '''
+        Counts the next chunk of the stream, emitting a snapshot every
+        snapshot_every chunks.
+        
+        Parameters:
+            chunk (str):
+                The text following the previously observed chunks
+        
+        Returns:
+            Optional[ModelSnapshot]:
+                A fresh snapshot if one is due, otherwise None
+        '''
+        counts = Counter(chunk)
+        if self._mode == "window":
+            if len(self._window) == self._window.maxlen:
+                self._totals -= self._window[0]
+            self._window.append(counts)
+            self._totals += counts
+        else:
+            self._scale /= self._decay
+            for char, count in counts.items():
+                self._weights[char] = self._weights.get(char, 0.0) + count * self._scale
+            if self._scale > 1e100:
+                self._rescale()
+        
+        self._chunks_seen += 1
+        if self._chunks_seen % self._snapshot_every == 0:
+            return self.snapshot()
+        return None
+    
+    def _rescale(self) -> None:
+        '''
+        Brings the stored decayed counts back to a _scale of 1 before it can
+        overflow, forgetting chars whose counts fell below min_weight.
+        '''
+        self._weights = {char: weight / self._scale for char, weight in self._weights.items()
+                         if weight / self._scale >= self._min_weight}
+        self._scale = 1.0
+    
+    def counts(self) -> dict[str, float]:
+        '''
+        Returns:
+            dict[str, float]:
+                The current (decayed or windowed) count of each char
+        '''
+        if self._mode == "window":
+            return {char: float(count) for char, count in self._totals.items()}
+        return {char: weight / self._scale for char, weight in self._weights.items()
+                if weight / self._scale >= self._min_weight}
+    
+    def snapshot(self) -> ModelSnapshot:
+        '''
+        Trains a fresh model on the current counts, each rounded to a whole
+        count of at least 1.
+        
+        Returns:
+            ModelSnapshot:
+                The model, with the next version id
+        '''
+        frequencies = counts_to_frequencies({char: max(1, round(count)) for char, count in self.counts().items()})
+        self._version += 1
+        return ModelSnapshot(self._version, ReusableHuffman.from_frequencies(frequencies, **self._options))
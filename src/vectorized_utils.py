@@ -0,0 +1,324 @@
+'''
+Optional NumPy engines for coding large messages in bulk with a
+ReusableHuffman model's codes, producing exactly the same output as the
+model's own methods. NumPy is not required: without it, every engine falls
+back to the model's pure Python implementation.
+'''
+
+import itertools
+from typing import *
+from compression_utils import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+# Codes must fit in the 64-bit words the vectorized encoder shifts them in
+MAX_VECTOR_CODE_LENGTH = 64
+
+class VectorEncoder:
+    '''
+    Bulk encoder that looks up the codes of many chars at once, and places
+    them into 64-bit words with array operations (see: compress_message).
+    '''
+
+    def __init__(self, huff_coder: ReusableHuffman, chunk_size: int = 1 << 18):
+        '''
+        Lays out the model's codes in arrays indexed by code point.
+
+        Parameters:
+            huff_coder (ReusableHuffman):
+                The model whose codes are used, and which compresses instead
+                when NumPy is missing or its codes are too long
+            chunk_size (int):
+                How many chars are encoded at a time, which bounds the size of
+                the intermediate arrays
+        '''
+        self._huff_coder = huff_coder
+        self._chunk_size = chunk_size
+        encoding_map = huff_coder.get_encoding_map()
+        self.vectorized = np is not None and all(
+            len(code) <= MAX_VECTOR_CODE_LENGTH for code in encoding_map.values())
+        if self.vectorized:
+            # Chars past the greatest code point, and chars of the range that
+            # have no code, get the 0-bit code of the last entry
+            size = ord(max(encoding_map)) + 2
+            self._values = np.zeros(size, dtype=np.uint64)
+            self._lengths = np.zeros(size, dtype=np.uint64)
+            for char, code in encoding_map.items():
+                self._values[ord(char)] = int(code, 2)
+                self._lengths[ord(char)] = len(code)
+
+    def compress_message(self, message: str) -> bytes:
+        '''
+        Compresses the message exactly as ReusableHuffman.compress_message
+        does: chars without a code are skipped, and the codes are followed by
+        the ETB_CHAR's and by 0-bit padding.
+
+        Parameters:
+            message (str):
+                The message to compress
+
+        Returns:
+            bytes:
+                The compressed message
+        '''
+        if not self.vectorized:
+            return self._huff_coder.compress_message(message)
+        code_points = np.frombuffer((message + ETB_CHAR).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        pieces: list[bytes] = []
+        # The partially filled word left by the previous chunk, and its bits
+        carry, carry_bits = 0, 0
+        for start in range(0, len(code_points), self._chunk_size):
+            words, total_bits = self._place(code_points[start:start + self._chunk_size], carry, carry_bits)
+            whole_words = total_bits >> 6
+            pieces.append(words[:whole_words].tobytes())
+            carry, carry_bits = int(words[whole_words]), total_bits & 63
+        # The last word holds the final bits, padded with 0 bits to a byte
+        pieces.append(carry.to_bytes(8, "big")[:(carry_bits + 7) >> 3])
+        return b"".join(pieces)
+
+    def _place(self, code_points: "np.ndarray[Any, np.dtype[np.uint32]]", carry: int,
+               carry_bits: int) -> tuple["np.ndarray[Any, np.dtype[Any]]", int]:
+        '''
+        Parameters:
+            code_points (np.ndarray):
+                The code points of consecutive chars of a message
+            carry, carry_bits (int):
+                The word whose first carry_bits bits precede those chars' codes
+
+        Returns:
+            tuple[np.ndarray, int]:
+                Big-endian 64-bit words holding the carried bits followed by the
+                codes of the chars (with one extra word, for a partial last
+                word to always exist), and the number of bits they hold
+        '''
+        indices = np.minimum(code_points, len(self._lengths) - 1)
+        values, lengths = self._values[indices], self._lengths[indices]
+        ends = np.cumsum(lengths) + np.uint64(carry_bits)
+        total_bits = int(ends[-1]) if len(ends) else carry_bits
+        starts = ends - lengths
+        word_indices = starts >> np.uint64(6)
+        # Each code is shifted to its offset within its word; the low bits of
+        # codes running past the end of the word spill into the next one
+        overflow = (starts & np.uint64(63)).astype(np.int64) + lengths.astype(np.int64) - 64
+        spilling = overflow > 0
+        left_shifts = np.where(spilling, 0, -overflow).astype(np.uint64)
+        right_shifts = np.where(spilling, overflow, 0).astype(np.uint64)
+        heads = (values << left_shifts) >> right_shifts
+        tails = values[spilling] << (np.uint64(64) - right_shifts[spilling])
+
+        # Codes do not overlap, so summing those within a word combines them
+        words = np.zeros((total_bits >> 6) + 2, dtype=np.uint64)
+        words[0] = carry
+        for contributions, targets in [(heads, word_indices), (tails, word_indices[spilling] + np.uint64(1))]:
+            if len(targets):
+                firsts = np.flatnonzero(np.diff(targets, prepend=np.uint64(len(words))))
+                words[targets[firsts]] |= np.add.reduceat(contributions, firsts)
+        return words.astype(">u8"), total_bits
+
+# Decoding tables are built for tries with at most this many internal nodes
+MAX_VECTOR_STATES = 4096
+# Pads the chars emitted by each decoding transition (not a code point)
+NO_CHAR = 0xFFFFFFFF
+# Rounds of retracing segments before the rest of a chunk is traced in order
+MAX_RETRACE_ROUNDS = 2
+
+class VectorDecoder:
+    '''
+    Bulk decoder that runs the model's trie as a state machine over whole
+    bytes, decoding many segments of a message at once (see: decompress).
+    '''
+
+    def __init__(self, huff_coder: ReusableHuffman, chunk_size: int = 1 << 18, segment_size: int = 128):
+        '''
+        Builds the byte-wise state transition table of the model's trie.
+
+        Parameters:
+            huff_coder (ReusableHuffman):
+                The model whose codes are used, and which decompresses instead
+                when NumPy is missing or its trie has too many nodes
+            chunk_size (int):
+                How many bytes are decoded at a time, which bounds the size of
+                the intermediate arrays
+            segment_size (int):
+                The length, in bytes, of the segments decoded side by side
+        '''
+        self._huff_coder = huff_coder
+        self._chunk_size = chunk_size
+        self._segment_size = segment_size
+        # The next state table as a list, for the rare sequential tracing
+        self._next_state_list: Optional[list[int]] = None
+        encoding_map = huff_coder.get_encoding_map()
+        self.vectorized = np is not None and len(encoding_map) - 1 <= MAX_VECTOR_STATES
+        if self.vectorized:
+            self._build_tables(trie_from_codes(encoding_map))
+
+    def _build_tables(self, root: HuffmanNode) -> None:
+        '''
+        Numbers the internal nodes of the trie as states (the root being 0),
+        and tabulates, for every state and byte, the state reached by walking
+        the byte's bits from it and the chars completed along the way. Bits
+        that start no code end decoding, by emitting the ETB_CHAR and moving
+        to a final dead state. The walks are made bit by bit for all states
+        and bytes at once, from per-bit tables.
+
+        Parameters:
+            root (HuffmanNode):
+                The root of the model's trie
+        '''
+        states = [root]
+        for node in states:
+            states += [child for child in (node.zero_child, node.one_child)
+                       if child is not None and not child.is_leaf()]
+        state_ids = {id(node): state for state, node in enumerate(states)}
+        dead = len(states)
+
+        # The state reached by each bit from each state, and the char it
+        # completes (or NO_CHAR); the dead state stays dead, emitting nothing
+        bit_next = [[dead, dead] for _ in range(dead + 1)]
+        bit_emit = [[NO_CHAR, NO_CHAR] for _ in range(dead + 1)]
+        for state, node in enumerate(states):
+            for bit, child in enumerate((node.zero_child, node.one_child)):
+                if child is None:
+                    bit_emit[state][bit] = ord(ETB_CHAR)
+                elif child.is_leaf():
+                    bit_next[state][bit], bit_emit[state][bit] = 0, ord(child.char)
+                else:
+                    bit_next[state][bit] = state_ids[id(child)]
+        # Flattened, so that row state << 1 | bit holds the step of the bit
+        next_by_bit = np.array(bit_next, dtype=np.int32).ravel()
+        emit_by_bit = np.array(bit_emit, dtype=np.uint32).ravel()
+
+        # Row state << 8 | byte walks the byte's bits from the state
+        current = np.repeat(np.arange(dead + 1, dtype=np.int32), 256)
+        byte_values = np.tile(np.arange(256, dtype=np.int32), dead + 1)
+        emit_chars = np.full((len(current), 8), NO_CHAR, dtype=np.uint32)
+        counts = np.zeros(len(current), dtype=np.intp)
+        for shift in range(7, -1, -1):
+            steps = current << 1 | byte_values >> shift & 1
+            emitted = np.take(emit_by_bit, steps)
+            current = np.take(next_by_bit, steps)
+            completed = np.flatnonzero(emitted != NO_CHAR)
+            emit_chars[completed, counts[completed]] = emitted[completed]
+            counts[completed] += 1
+        width = int(counts.max()) or 1
+        # Indexed by state << 8 | byte, a transition's next state is also kept
+        # shifted left by 8, ready to index these again; rows of emitted chars
+        # are padded with NO_CHAR
+        self._next_states = current << 8
+        self._emit_chars = emit_chars[:, :width].copy()
+
+    def decompress(self, compressed_msg: bytes) -> str:
+        '''
+        Decompresses the message exactly as ReusableHuffman.decompress does,
+        stopping at the ETB_CHAR (or at bits that start no code).
+
+        Parameters:
+            compressed_msg (bytes):
+                A message compressed with the model
+
+        Returns:
+            str:
+                The decompressed message
+        '''
+        if not self.vectorized:
+            return self._huff_coder.decompress(compressed_msg)
+        data = np.frombuffer(compressed_msg, dtype=np.uint8)
+        pieces: list[bytes] = []
+        state = 0
+        for start in range(0, len(data), self._chunk_size):
+            chunk = data[start:start + self._chunk_size]
+            transitions = self._trace(chunk, state) | chunk
+            emitted = np.take(self._emit_chars, transitions, axis=0).ravel()
+            chars = np.compress(emitted != NO_CHAR, emitted)
+            stops = np.flatnonzero(chars == ord(ETB_CHAR))
+            if len(stops):
+                pieces.append(chars[:stops[0]].tobytes())
+                break
+            pieces.append(chars.tobytes())
+            state = int(self._next_states[transitions[-1]])
+        return b"".join(pieces).decode("utf-32-le", "surrogatepass")
+
+    def _trace(self, chunk: "np.ndarray[Any, np.dtype[np.uint8]]", state: int) -> "np.ndarray[Any, np.dtype[np.int32]]":
+        '''
+        Finds the state before each byte of the chunk. The chunk is split into
+        segments that are each first traced from the root, all at once; a
+        segment whose true start state differs is then retraced only until it
+        agrees with its first tracing. Most Huffman codes soon resynchronize,
+        but some never do (fixed-length codes, say), so after a few rounds of
+        retracing the rest of the chunk is traced one byte at a time.
+
+        Parameters:
+            chunk (np.ndarray):
+                Consecutive bytes of a compressed message
+            state (int):
+                The state before the first byte, shifted left by 8
+
+        Returns:
+            np.ndarray:
+                The state before each byte of the chunk, shifted left by 8
+        '''
+        segment_size = min(self._segment_size, len(chunk))
+        segment_count = -(-len(chunk) // segment_size)
+        padded = np.zeros(segment_count * segment_size, dtype=np.int32)
+        padded[:len(chunk)] = chunk
+        # Row i holds the i-th byte of every segment, for contiguous access
+        columns = padded.reshape(segment_count, segment_size).T.copy()
+        next_states = self._next_states
+
+        traced = np.empty((segment_size, segment_count), dtype=np.int32)
+        current = np.zeros(segment_count, dtype=np.int32)
+        for column, row in enumerate(columns):
+            traced[column] = current
+            current = np.take(next_states, current | row)
+        exits = current
+        # Bytes padding the last segment may change its exit, which is unused
+        starts = np.concatenate(([state], exits[:-1])).astype(np.int32)
+        for _ in range(MAX_RETRACE_ROUNDS):
+            wrong = np.flatnonzero(starts != traced[0])
+            if not len(wrong):
+                return traced.T.ravel()[:len(chunk)]
+            current = starts[wrong]
+            for column, row in enumerate(columns):
+                differs = current != traced[column, wrong]
+                if not differs.all():
+                    wrong, current = wrong[differs], current[differs]
+                    if not len(wrong):
+                        break
+                traced[column, wrong] = current
+                current = np.take(next_states, current | row[wrong])
+            else:
+                # Segments that never agreed change the start of the next
+                exits[wrong] = current
+                starts = np.concatenate(([state], exits[:-1])).astype(np.int32)
+
+        # Segments before the first disagreeing one start, and so are traced,
+        # correctly; the rest of the chunk is traced sequentially from there
+        wrong = np.flatnonzero(starts != traced[0])
+        if not len(wrong):
+            return traced.T.ravel()[:len(chunk)]
+        settled = int(wrong[0]) * segment_size
+        return np.concatenate((traced.T.ravel()[:settled],
+                               self._trace_sequentially(chunk[settled:], int(starts[wrong[0]]))))
+
+    def _trace_sequentially(self, chunk: "np.ndarray[Any, np.dtype[np.uint8]]",
+                            state: int) -> "np.ndarray[Any, np.dtype[np.int32]]":
+        '''
+        Parameters:
+            chunk (np.ndarray):
+                Consecutive bytes of a compressed message
+            state (int):
+                The state before the first byte, shifted left by 8
+
+        Returns:
+            np.ndarray:
+                The state before each byte of the chunk, shifted left by 8
+        '''
+        if self._next_state_list is None:
+            self._next_state_list = self._next_states.tolist()
+        next_states = self._next_state_list
+        states = itertools.accumulate(chunk.tolist()[:-1], lambda current, byte: next_states[current | byte],
+                                      initial=state)
+        return np.fromiter(states, dtype=np.int32, count=len(chunk))